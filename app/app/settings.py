@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,22 +39,29 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
     'user',
-    'recipe'
+    'recipe',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'core.slowqueries.SlowQueryMiddleware',
+    'core.timing.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.querybudget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -80,16 +88,63 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASSWORD')
+        'PASSWORD': os.environ.get('DB_PASSWORD'),
+        # Seconds to keep a connection open across requests, 0 closes it
+        # after each request (or returns it to the pool).
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DB_CONN_MAX_AGE', 0 if DB_POOL_SIZE else 60)),
+        # Check a reused connection still works before using it.
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        # Share at most MAX_SIZE connections between the threads of a
+        # process, 0 disables the pool. Needs DB_CONN_MAX_AGE=0.
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Point CACHE_BACKEND at a shared cache (e.g. memcached) when running
+# several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Cache API list responses. Writes invalidate them through the cache, so
+# with a per-process cache the other workers would keep serving stale
+# lists: only on by default when the cache is shared.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+API_RESPONSE_CACHE = bool(int(os.environ.get(
+    'API_RESPONSE_CACHE',
+    CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES,
+)))
+
+# Seconds a cached API list response is kept.
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -133,6 +188,20 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Resized copies generated for uploaded recipe images, see core.images.
+RECIPE_IMAGE_RENDITIONS = {
+    'thumb': (200, 200),
+    'medium': (600, 600),
+    'large': (1200, 1200),
+}
+RECIPE_IMAGE_FORMATS = ['webp', 'jpeg']
+RECIPE_IMAGE_QUALITY = 80
+
+# Image job queue, see core.jobs. Delays are in seconds.
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_RETRY_DELAY = 30
+IMAGE_JOB_STALE_AFTER = 600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -140,10 +209,95 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# JSON library used to render and parse API bodies: orjson or stdlib.
+# The orjson classes fall back to stdlib json when it is not installed.
+API_JSON_BACKEND = os.environ.get('API_JSON_BACKEND', 'orjson')
+if API_JSON_BACKEND == 'orjson':
+    JSON_RENDERER = 'core.renderers.ORJSONRenderer'
+    JSON_PARSER = 'core.parsers.ORJSONParser'
+else:
+    JSON_RENDERER = 'rest_framework.renderers.JSONRenderer'
+    JSON_PARSER = 'rest_framework.parsers.JSONParser'
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Default page size for cursor paginated list endpoints.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+
+# Token -> user lookups cached by user.authentication.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'USE_DJANGO_CACHE': bool(
+        int(os.environ.get('TOKEN_AUTH_USE_DJANGO_CACHE', 0))
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
+
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+# Raise instead of logging when a view goes over its query budget.
+QUERY_BUDGET_RAISE = DEBUG or TESTING
+
+# Report the SQL queries run for each request in an X-Query-Count
+# response header, read by the loadtest command.
+QUERY_COUNT_HEADER = bool(
+    int(os.environ.get('QUERY_COUNT_HEADER', int(DEBUG)))
+)
+
+# Per-phase request timings sent as Server-Timing headers and logged,
+# see core.timing. Keep the sample rate low in production.
+SERVER_TIMING = {
+    'SAMPLE_RATE': float(
+        os.environ.get('SERVER_TIMING_SAMPLE_RATE', 1 if DEBUG else 0.01)
+    ),
+    'HEADER': bool(int(os.environ.get('SERVER_TIMING_HEADER', int(DEBUG)))),
+    'LOG': bool(int(os.environ.get('SERVER_TIMING_LOG', 1))),
+}
+
+# Queries slower than THRESHOLD_MS are saved with their plan and
+# shown in the admin, see core.slowqueries.
+SLOW_QUERY_LOG = {
+    'ENABLED': bool(int(os.environ.get('SLOW_QUERY_LOG', 1))),
+    'THRESHOLD_MS': int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200)),
+    'MAX_ROWS': int(os.environ.get('SLOW_QUERY_MAX_ROWS', 1000)),
+    # Save parameter values, not just their types. They are shown to
+    # staff and may hold personal data.
+    'CAPTURE_PARAMS': bool(
+        int(os.environ.get('SLOW_QUERY_CAPTURE_PARAMS', 0))
+    ),
+}
+
+# Bearer token Prometheus must send to scrape /metrics, open if empty.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Number of NDJSON lines validated and written per bulk import batch.
+RECIPE_IMPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_IMPORT_CHUNK_SIZE', 500))
+
+# Number of recipes read per server-side cursor fetch when exporting.
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 1000))
+
+# Render recipe list pages from .values() rows instead of model
+# instances and DRF fields. Same output, much less CPU on large pages.
+RECIPE_FAST_LIST = bool(int(os.environ.get('RECIPE_FAST_LIST', 0)))
+
+# Negotiated gzip/brotli response compression, see core.compression.
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+    'GZIP_LEVEL': int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6)),
+    'BROTLI_QUALITY': int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4)),
+}
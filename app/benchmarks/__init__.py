@@ -0,0 +1,9 @@
+"""
+Load testing of the API against a local database.
+
+``seed_loadtest`` fills the database with users, recipes, tags and
+ingredients at realistic volumes, ``loadtest`` drives the API of a
+running server with concurrent clients, reports latency percentiles,
+throughput and SQL queries per request, and stores the results as JSON
+to compare later runs against.
+"""
@@ -0,0 +1,210 @@
+"""
+Concurrent load generator and result statistics.
+
+Each worker thread keeps one HTTP connection open to the server and
+sends requests from the weighted scenarios until the run is over.
+Latency is measured from sending the request to reading the whole
+body. The number of SQL queries comes from the ``X-Query-Count`` header
+set when the server runs with ``QUERY_COUNT_HEADER`` on.
+"""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class Worker(threading.Thread):
+    """Send requests until `deadline` or until `budget` runs out."""
+
+    def __init__(self, base_url, scenarios, users, deadline, budget,
+                 headers, seed, timeout):
+        super().__init__(daemon=True)
+        url = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection \
+            if url.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip('/')
+        self.names = list(scenarios)
+        self.weights = [scenarios[name][0] for name in self.names]
+        self.builders = [scenarios[name][1] for name in self.names]
+        self.users = users
+        self.deadline = deadline
+        self.budget = budget
+        self.headers = headers
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.connection = None
+        self.results = []
+
+    def run(self):
+        while time.monotonic() < self.deadline and self.budget.take():
+            index = self.rng.choices(
+                range(len(self.names)), self.weights)[0]
+            user = self.rng.choice(self.users)
+            method, path, body = self.builders[index](user, self.rng)
+            self.results.append(
+                (self.names[index], *self._send(user, method, path, body)))
+        if self.connection is not None:
+            self.connection.close()
+
+    def _send(self, user, method, path, body):
+        headers = {
+            **self.headers,
+            'Authorization': f"Token {user['token']}",
+        }
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            response = self._request(method, self.prefix + path, body,
+                                     headers)
+            response.read()
+        except (OSError, http.client.HTTPException):
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            return 0, time.perf_counter() - start, None
+        seconds = time.perf_counter() - start
+        queries = response.getheader('X-Query-Count')
+        return response.status, seconds, \
+            int(queries) if queries is not None else None
+
+    def _request(self, method, path, body, headers):
+        # Retry once on a fresh connection if the server closed ours.
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(
+                    self.netloc, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body, headers)
+                return self.connection.getresponse()
+            except (ConnectionError, http.client.RemoteDisconnected):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+class Budget:
+    """Thread safe countdown of the requests left to send, if limited."""
+
+    def __init__(self, total=None):
+        self._left = total
+        self._lock = threading.Lock()
+
+    def take(self):
+        if self._left is None:
+            return True
+        with self._lock:
+            if self._left <= 0:
+                return False
+            self._left -= 1
+            return True
+
+
+def run_load(base_url, scenarios, users, concurrency, duration,
+             requests=None, headers=None, seed=0, timeout=30):
+    """Drive `base_url` with `concurrency` workers for `duration`
+    seconds or `requests` requests in total, whichever comes first.
+
+    Returns the (scenario, status, seconds, queries) results and the
+    elapsed wall time.
+    """
+    budget = Budget(requests)
+    start = time.monotonic()
+    workers = [
+        Worker(base_url, scenarios, users, start + duration, budget,
+               headers or {}, seed + n, timeout)
+        for n in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - start
+    return [result for worker in workers for result in worker.results], \
+        elapsed
+
+
+def _stats(results, elapsed):
+    latencies = sorted(seconds * 1000 for _, _, seconds, _ in results)
+    queries = sorted(q for _, _, _, q in results if q is not None)
+    errors = sum(1 for _, status, _, _ in results
+                 if not 200 <= status < 400)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'requests_per_second': round(len(results) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'p95': percentile(queries, 95),
+            'max': queries[-1],
+        } if queries else None,
+    }
+
+
+def summarize(results, elapsed):
+    """Statistics over all results and per scenario."""
+    by_scenario = defaultdict(list)
+    for result in results:
+        by_scenario[result[0]].append(result)
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'total': _stats(results, elapsed) if results else None,
+        'scenarios': {
+            name: _stats(scenario_results, elapsed)
+            for name, scenario_results in sorted(by_scenario.items())
+        },
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return the regressions of `current` against `baseline` summaries.
+
+    A scenario regresses when its p95 latency grows, or its throughput
+    drops, by more than `threshold` (a fraction), or when it runs more
+    queries per request on average.
+    """
+    regressions = []
+    for name, new in current['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None:
+            continue
+        old_p95 = old['latency_ms']['p95']
+        new_p95 = new['latency_ms']['p95']
+        if new_p95 > old_p95 * (1 + threshold):
+            regressions.append(
+                f'{name}: p95 latency {old_p95:.1f} -> {new_p95:.1f} ms')
+        old_rps = old['requests_per_second']
+        new_rps = new['requests_per_second']
+        if new_rps < old_rps * (1 - threshold):
+            regressions.append(
+                f'{name}: throughput {old_rps:.1f} -> {new_rps:.1f} req/s')
+        old_queries = old['queries_per_request']
+        new_queries = new['queries_per_request']
+        if old_queries and new_queries and \
+                new_queries['mean'] > old_queries['mean'] + 0.5:
+            regressions.append(
+                f"{name}: queries per request {old_queries['mean']} -> "
+                f"{new_queries['mean']}")
+    return regressions
@@ -0,0 +1,134 @@
+"""
+Django command to load test a running server with the seeded users.
+
+Start the server with ``QUERY_COUNT_HEADER=1`` to get SQL queries per
+request, and seed it first with ``seed_loadtest``. Results can be
+written to a JSON file and compared with the file of an earlier run,
+failing the command on regressions.
+"""
+import json
+import platform
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.load import compare, run_load, summarize
+from benchmarks.scenarios import SCENARIOS, load_users
+
+
+class Command(BaseCommand):
+    help = 'Drive the API of a running server with concurrent clients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Seconds to run for.',
+        )
+        parser.add_argument(
+            '--requests', type=int,
+            help='Stop after this many requests in total.',
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=0,
+            help='Seconds of load sent before measuring.',
+        )
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=sorted(SCENARIOS),
+            help='Scenarios to run, all by default.',
+        )
+        parser.add_argument(
+            '--users', type=int, help='Seeded users to send requests as.')
+        parser.add_argument(
+            '--accept-encoding', default='br, gzip',
+            help='Accept-Encoding sent with requests, empty for none.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results here.')
+        parser.add_argument(
+            '--baseline', help='Results of an earlier run to compare with.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Fraction a metric may worsen by against the baseline.',
+        )
+
+    def handle(self, *args, **options):
+        users = load_users(options['users'])
+        if not users:
+            raise CommandError(
+                'No seeded users with recipes, run seed_loadtest first.')
+        scenarios = {
+            name: SCENARIOS[name]
+            for name in options['scenarios'] or SCENARIOS
+        }
+        headers = {'Accept': 'application/json'}
+        if options['accept_encoding']:
+            headers['Accept-Encoding'] = options['accept_encoding']
+
+        if options['warmup']:
+            self.stdout.write(f"Warming up for {options['warmup']}s...")
+            run_load(options['base_url'], scenarios, users,
+                     options['concurrency'], options['warmup'],
+                     headers=headers, seed=options['seed'])
+
+        self.stdout.write(
+            f"Sending requests as {len(users)} users with "
+            f"{options['concurrency']} clients..."
+        )
+        results, elapsed = run_load(
+            options['base_url'], scenarios, users, options['concurrency'],
+            options['duration'], requests=options['requests'],
+            headers=headers, seed=options['seed'],
+        )
+        if not results:
+            raise CommandError('No requests were sent.')
+        summary = summarize(results, elapsed)
+        self._report(summary)
+
+        if options['output']:
+            run = {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'options': {
+                    key: options[key] for key in (
+                        'base_url', 'concurrency', 'duration', 'requests',
+                        'warmup', 'users', 'accept_encoding', 'seed',
+                    )
+                },
+                'users': len(users),
+                **summary,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare(baseline, summary, options['threshold'])
+            if regressions:
+                raise CommandError(
+                    'Regressions against the baseline:\n  ' +
+                    '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(
+                'No regressions against the baseline.'))
+
+    def _report(self, summary):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'scenario':<22}{'reqs':>7}{'errs':>6}{'req/s':>9}"
+            f"{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}"
+        ))
+        rows = list(summary['scenarios'].items())
+        rows.append(('total', summary['total']))
+        for name, stats in rows:
+            latency = stats['latency_ms']
+            queries = stats['queries_per_request']
+            self.stdout.write(
+                f"{name:<22}{stats['requests']:>7}{stats['errors']:>6}"
+                f"{stats['requests_per_second']:>9.1f}"
+                f"{latency['p50']:>9.1f}{latency['p95']:>9.1f}"
+                f"{latency['p99']:>9.1f}"
+                f"{queries['mean'] if queries else '-':>9}"
+            )
+        self.stdout.write('Latencies in ms, queries are the mean per request.')
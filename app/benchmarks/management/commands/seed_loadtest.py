@@ -0,0 +1,62 @@
+"""
+Django command to seed the database with load test data.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import reset, seed
+
+LOCAL_HOSTS = {'', 'localhost', '127.0.0.1', '::1', 'db'}
+
+
+def is_local(host):
+    """Whether `host` is this machine, a unix socket directory or the
+    docker-compose db service."""
+    return host in LOCAL_HOSTS or host.startswith('/')
+
+
+class Command(BaseCommand):
+    help = 'Create users with recipes, tags and ingredients to load test.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument(
+            '--recipes', type=int, default=500,
+            help='Recipes seeded per user.',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=40, help='Tags seeded per user.')
+        parser.add_argument(
+            '--ingredients', type=int, default=150,
+            help='Ingredients seeded per user.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Delete previously seeded users first.',
+        )
+        parser.add_argument(
+            '--allow-remote', action='store_true',
+            help='Seed a database that is not on this machine or the '
+                 'docker-compose db service.',
+        )
+
+    def handle(self, *args, **options):
+        host = settings.DATABASES['default'].get('HOST') or ''
+        if not is_local(host) and not options['allow_remote']:
+            raise CommandError(
+                f'Refusing to seed the database on {host}, '
+                'pass --allow-remote to do it anyway.')
+
+        if options['reset']:
+            deleted, _ = reset()
+            self.stdout.write(f'Deleted {deleted} rows.')
+
+        self.stdout.write(
+            f"Seeding {options['users']} users with {options['recipes']} "
+            f"recipes, {options['tags']} tags and {options['ingredients']} "
+            f"ingredients each..."
+        )
+        seed(options['users'], options['recipes'], options['tags'],
+             options['ingredients'], seed=options['seed'])
+        self.stdout.write(self.style.SUCCESS('Done.'))
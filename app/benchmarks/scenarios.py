@@ -0,0 +1,122 @@
+"""
+Requests the load generator sends, with their relative weights.
+
+Each scenario builds one request for a seeded user picked at random:
+a (method, path, JSON body) tuple. Writes are kept rare so that a run
+does not grow the data it measures by much.
+"""
+from django.urls import reverse
+
+from benchmarks.seed import PASSWORD, WORDS, seeded_users
+from core.models import Ingredient, Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+FACETS_URL = reverse('recipe:recipe-facets')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+
+# Recipe ids loaded per user to pick details and updates from.
+MAX_RECIPE_IDS = 1000
+
+
+def load_users(limit=None):
+    """Return the seeded users as dicts of what scenarios need."""
+    users = []
+    queryset = seeded_users().select_related('auth_token').order_by('id')
+    for user in queryset[:limit]:
+        users.append({
+            'email': user.email,
+            'token': user.auth_token.key,
+            'recipe_ids': list(
+                Recipe.objects.filter(user=user).order_by('-id')
+                .values_list('id', flat=True)[:MAX_RECIPE_IDS]),
+            'tag_ids': list(
+                Tag.objects.filter(user=user).values_list('id', flat=True)),
+            'ingredient_ids': list(
+                Ingredient.objects.filter(user=user)
+                .values_list('id', flat=True)),
+        })
+    return [user for user in users if user['recipe_ids']]
+
+
+def _ids(rng, ids, count):
+    return ','.join(str(pk) for pk in rng.sample(ids, min(count, len(ids))))
+
+
+def recipe_list(user, rng):
+    return 'GET', RECIPES_URL, None
+
+
+def recipe_list_filtered(user, rng):
+    return 'GET', (
+        f"{RECIPES_URL}?tags={_ids(rng, user['tag_ids'], 2)}"
+        f"&ingredients={_ids(rng, user['ingredient_ids'], 1)}"
+    ), None
+
+
+def recipe_search(user, rng):
+    return 'GET', f'{RECIPES_URL}?q={rng.choice(WORDS)}', None
+
+
+def recipe_detail(user, rng):
+    return 'GET', f"{RECIPES_URL}{rng.choice(user['recipe_ids'])}/", None
+
+
+def recipe_facets(user, rng):
+    return 'GET', f"{FACETS_URL}?tags={_ids(rng, user['tag_ids'], 1)}", None
+
+
+def recipe_create(user, rng):
+    return 'POST', RECIPES_URL, {
+        'title': f'Load test {rng.choice(WORDS)}',
+        'time_minutes': rng.randint(5, 180),
+        'price': '9.99',
+        'tags': [{'name': f'Tag {rng.randint(0, 9)}'}],
+        'ingredients': [
+            {'name': word} for word in rng.sample(WORDS, 5)
+        ],
+    }
+
+
+def recipe_update(user, rng):
+    return 'PATCH', f"{RECIPES_URL}{rng.choice(user['recipe_ids'])}/", {
+        'time_minutes': rng.randint(5, 180),
+    }
+
+
+def tag_list(user, rng):
+    return 'GET', TAGS_URL, None
+
+
+def tag_list_assigned(user, rng):
+    return 'GET', f'{TAGS_URL}?assigned_only=1', None
+
+
+def ingredient_list(user, rng):
+    return 'GET', INGREDIENTS_URL, None
+
+
+def user_me(user, rng):
+    return 'GET', ME_URL, None
+
+
+def user_token(user, rng):
+    return 'POST', TOKEN_URL, {'email': user['email'], 'password': PASSWORD}
+
+
+SCENARIOS = {
+    'recipe-list': (20, recipe_list),
+    'recipe-list-filtered': (10, recipe_list_filtered),
+    'recipe-search': (5, recipe_search),
+    'recipe-detail': (20, recipe_detail),
+    'recipe-facets': (5, recipe_facets),
+    'recipe-create': (2, recipe_create),
+    'recipe-update': (2, recipe_update),
+    'tag-list': (8, tag_list),
+    'tag-list-assigned': (4, tag_list_assigned),
+    'ingredient-list': (8, ingredient_list),
+    'user-me': (8, user_me),
+    'user-token': (1, user_token),
+}
@@ -0,0 +1,110 @@
+"""
+Seeding of load test data.
+
+Every seeded user has an email matching ``EMAIL`` and the password
+``PASSWORD``, so the load generator can find them again and log in.
+Rows are bulk created: no signals are sent, recipe counts are set here.
+"""
+import random
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from core.counters import adjust_recipe_counts
+from core.models import Ingredient, Recipe, Tag
+
+EMAIL = 'loadtest{n}@example.com'
+EMAIL_PATTERN = r'^loadtest\d+@example\.com$'
+PASSWORD = 'loadtest-password'
+
+WORDS = [
+    'roasted', 'spicy', 'garlic', 'lemon', 'chicken', 'tofu', 'pasta',
+    'salad', 'curry', 'soup', 'stew', 'grilled', 'smoky', 'herb', 'rice',
+    'noodles', 'honey', 'ginger', 'tomato', 'mushroom', 'baked', 'crispy',
+    'sweet', 'sour', 'coconut', 'lime', 'chili', 'basil', 'pesto', 'bean',
+]
+
+
+def seeded_users():
+    return get_user_model().objects.filter(email__regex=EMAIL_PATTERN)
+
+
+def reset():
+    """Delete every seeded user with their data."""
+    return seeded_users().delete()
+
+
+def _title(rng):
+    return ' '.join(rng.sample(WORDS, rng.randint(2, 4))).capitalize()
+
+
+@transaction.atomic
+def seed(users, recipes, tags, ingredients, seed=0):
+    """Create `users` users with `recipes` recipes, `tags` tags and
+    `ingredients` ingredients each.
+
+    Recipes get 1-5 tags and 3-12 ingredients. Returns the users.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    start = seeded_users().count()
+    password = make_password(PASSWORD)
+    created = User.objects.bulk_create(
+        User(email=EMAIL.format(n=start + n), name=f'Load test {n}',
+             password=password)
+        for n in range(users)
+    )
+    Token.objects.bulk_create(
+        Token(key=Token.generate_key(), user=user) for user in created)
+
+    tag_links = []
+    ingredient_links = []
+    for user in created:
+        user_tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {n}') for n in range(tags))
+        user_ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'{rng.choice(WORDS)} {n}')
+            for n in range(ingredients)
+        )
+        user_recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=user,
+                    title=_title(rng),
+                    time_minutes=rng.randint(5, 180),
+                    price=rng.randint(100, 9999) / 100,
+                    description=' '.join(rng.choices(WORDS, k=30)),
+                    link=f'https://example.com/recipes/{user.pk}/{n}',
+                )
+                for n in range(recipes)
+            ),
+            batch_size=1000,
+        )
+        for recipe in user_recipes:
+            tag_links += (
+                (recipe.pk, tag.pk) for tag in rng.sample(
+                    user_tags, min(rng.randint(1, 5), len(user_tags))))
+            ingredient_links += (
+                (recipe.pk, ingredient.pk) for ingredient in rng.sample(
+                    user_ingredients,
+                    min(rng.randint(3, 12), len(user_ingredients))))
+
+    TagLink = Recipe.tags.through
+    IngredientLink = Recipe.ingredients.through
+    TagLink.objects.bulk_create(
+        (TagLink(recipe_id=recipe_id, tag_id=tag_id)
+         for recipe_id, tag_id in tag_links),
+        batch_size=5000,
+    )
+    IngredientLink.objects.bulk_create(
+        (IngredientLink(recipe_id=recipe_id, ingredient_id=ingredient_id)
+         for recipe_id, ingredient_id in ingredient_links),
+        batch_size=5000,
+    )
+    adjust_recipe_counts(Tag, Counter(tag_id for _, tag_id in tag_links))
+    adjust_recipe_counts(Ingredient, Counter(
+        ingredient_id for _, ingredient_id in ingredient_links))
+    return created
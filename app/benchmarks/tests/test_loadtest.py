@@ -0,0 +1,151 @@
+""" Tests for the load test commands """
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.db import connections
+from django.test import (
+    LiveServerTestCase,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+
+from benchmarks.load import compare, percentile, summarize
+from benchmarks.management.commands.seed_loadtest import is_local
+from benchmarks.seed import seed, seeded_users
+from core.models import Recipe, Tag
+
+
+class StatisticsTests(SimpleTestCase):
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize(self):
+        results = [
+            ('list', 200, 0.010, 3),
+            ('list', 200, 0.030, 3),
+            ('detail', 404, 0.020, 2),
+        ]
+
+        summary = summarize(results, elapsed=2)
+
+        self.assertEqual(summary['total']['requests'], 3)
+        self.assertEqual(summary['total']['errors'], 1)
+        self.assertEqual(summary['total']['requests_per_second'], 1.5)
+        self.assertEqual(summary['scenarios']['list']['latency_ms']['p50'],
+                         10)
+        self.assertEqual(
+            summary['scenarios']['list']['queries_per_request']['mean'], 3)
+
+    def test_compare_flags_regressions(self):
+        baseline = summarize([('list', 200, 0.010, 3)] * 10, elapsed=1)
+        slower = summarize([('list', 200, 0.020, 3)] * 10, elapsed=1)
+        more_queries = summarize([('list', 200, 0.010, 5)] * 10, elapsed=1)
+
+        self.assertEqual(compare(baseline, baseline, 0.1), [])
+        self.assertEqual(len(compare(baseline, slower, 0.1)), 1)
+        self.assertEqual(len(compare(baseline, more_queries, 0.1)), 1)
+
+
+class SeedTests(TestCase):
+
+    def test_seed_counts_recipes(self):
+        seed(users=2, recipes=10, tags=5, ingredients=20)
+
+        self.assertEqual(seeded_users().count(), 2)
+        self.assertEqual(Recipe.objects.count(), 20)
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+
+    @patch('benchmarks.management.commands.seed_loadtest.is_local',
+           return_value=False)
+    def test_seed_refuses_remote_database(self, mock_is_local):
+        with self.assertRaises(CommandError):
+            call_command('seed_loadtest', users=1, stdout=StringIO())
+
+        self.assertFalse(seeded_users().exists())
+
+    def test_is_local(self):
+        self.assertTrue(is_local(''))
+        self.assertTrue(is_local('db'))
+        self.assertTrue(is_local('/var/run/postgresql'))
+        self.assertFalse(is_local('db.example.com'))
+
+
+class ConnectionClosingServer(ThreadedWSGIServer):
+    """Close the request thread's connections, persistent ones would
+    keep the test database from being dropped."""
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            connections.close_all()
+
+
+class ConnectionClosingLiveServerThread(LiveServerThread):
+
+    def _create_server(self):
+        return ConnectionClosingServer(
+            (self.host, self.port), QuietWSGIRequestHandler,
+            allow_reuse_address=False)
+
+
+@override_settings(QUERY_COUNT_HEADER=True)
+class LoadTestCommandTests(LiveServerTestCase):
+    server_thread_class = ConnectionClosingLiveServerThread
+
+    def setUp(self):
+        call_command('seed_loadtest', users=2, recipes=5, tags=3,
+                     ingredients=10, allow_remote=True, stdout=StringIO())
+        fd, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, self.output)
+
+    def test_loadtest_writes_results(self):
+        call_command(
+            'loadtest', base_url=self.live_server_url, concurrency=2,
+            requests=30, output=self.output, stdout=StringIO(),
+        )
+
+        with open(self.output) as f:
+            results = json.load(f)
+        self.assertEqual(results['total']['requests'], 30)
+        self.assertEqual(results['total']['errors'], 0)
+        self.assertIsNotNone(results['total']['queries_per_request'])
+        for stats in results['scenarios'].values():
+            self.assertLessEqual(stats['latency_ms']['p50'],
+                                 stats['latency_ms']['p99'])
+
+    def test_loadtest_compares_with_baseline(self):
+        call_command(
+            'loadtest', base_url=self.live_server_url, requests=10,
+            scenarios=['user-me'], output=self.output, stdout=StringIO(),
+        )
+        with open(self.output) as f:
+            baseline = json.load(f)
+        baseline['scenarios']['user-me']['queries_per_request']['mean'] = 0
+        baseline['scenarios']['user-me']['latency_ms']['p95'] = 0.001
+        with open(self.output, 'w') as f:
+            json.dump(baseline, f)
+
+        with self.assertRaisesMessage(CommandError, 'user-me: p95 latency'):
+            call_command(
+                'loadtest', base_url=self.live_server_url, requests=10,
+                scenarios=['user-me'], baseline=self.output,
+                stdout=StringIO(),
+            )
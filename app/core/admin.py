@@ -1,6 +1,10 @@
+import json
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from core import models
+from core.slowqueries import plan_nodes
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
 
@@ -40,3 +44,48 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
+
+
+class ImageJobAdmin(admin.ModelAdmin):
+    ordering = ['-id']
+    list_display = ['id', 'recipe', 'status', 'attempts', 'duration',
+                    'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'finished_at', 'duration']
+
+
+admin.site.register(models.ImageJob, ImageJobAdmin)
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    ordering = ['-id']
+    list_display = ['created_at', 'duration_ms', 'view', 'plan_summary']
+    list_filter = ['view']
+    search_fields = ['sql', 'view', 'path']
+    readonly_fields = ['created_at', 'duration_ms', 'view', 'path', 'sql',
+                       'params', 'plan_summary', 'formatted_plan']
+    exclude = ['duration', 'plan']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='duration (ms)', ordering='duration')
+    def duration_ms(self, obj):
+        return round(obj.duration * 1000, 1)
+
+    @admin.display(description='plan')
+    def plan_summary(self, obj):
+        if obj.plan is None:
+            return '-'
+        return ' > '.join(plan_nodes(obj.plan['Plan']))
+
+    @admin.display(description='EXPLAIN output')
+    def formatted_plan(self, obj):
+        return format_html(
+            '<pre>{}</pre>', json.dumps(obj.plan, indent=2))
+
+
+admin.site.register(models.SlowQuery, SlowQueryAdmin)
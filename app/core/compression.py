@@ -0,0 +1,193 @@
+"""
+Negotiated gzip/brotli compression of responses.
+
+CompressionMiddleware picks brotli or gzip from the request's
+Accept-Encoding by q-value, preferring brotli on ties when the Brotli
+package is installed. It leaves alone bodies under ``MIN_SIZE`` bytes,
+media that is already compressed and responses that already have a
+Content-Encoding. Streaming responses are compressed chunk by chunk.
+
+As in Django's GZipMiddleware, strong ETags of compressed responses are
+weakened, since the bytes are not those the ETag was computed for (RFC
+7232 section 2.3).
+
+Bytes in and out and the time spent compressing are counted per
+encoding in `stats` and in the Prometheus metrics.
+"""
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core.metrics import observe_compression
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+DEFAULTS = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+    'SKIP_CONTENT_TYPES': (
+        'image/', 'video/', 'audio/', 'font/woff',
+        'application/gzip', 'application/x-gzip', 'application/zip',
+        'application/pdf', 'application/octet-stream',
+    ),
+}
+
+
+def _settings():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+
+class CompressionStats:
+    """Thread safe per-encoding counters of compression work."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def record(self, encoding, bytes_in, bytes_out, seconds):
+        with self._lock:
+            entry = self._data.setdefault(encoding, {
+                'responses': 0, 'bytes_in': 0, 'bytes_out': 0,
+                'seconds': 0.0,
+            })
+            entry['responses'] += 1
+            entry['bytes_in'] += bytes_in
+            entry['bytes_out'] += bytes_out
+            entry['seconds'] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                encoding: {
+                    **entry,
+                    'bytes_saved': entry['bytes_in'] - entry['bytes_out'],
+                }
+                for encoding, entry in self._data.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+stats = CompressionStats()
+
+
+def accepted_encodings(header):
+    """Return {coding: q} for an Accept-Encoding header.
+
+    Codings with an unparsable q-value are left out.
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = part.split(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        try:
+            for param in params:
+                name, _, value = param.partition('=')
+                if name.strip().lower() == 'q':
+                    q = float(value)
+        except ValueError:
+            continue
+        if coding:
+            accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """Pick the encoding to use for a request's Accept-Encoding.
+
+    The coding with the highest q-value wins, brotli on ties. A coding
+    listed with q=0 is never used, even if ``*`` is accepted.
+    """
+    accepted = accepted_encodings(header)
+    choice, best = None, 0
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        q = accepted.get(encoding, accepted.get('*', 0))
+        if q > best:
+            choice, best = encoding, q
+    return choice
+
+
+def _compressor(encoding, options):
+    """Return (compress, flush) callables for a streaming compressor."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=options['BROTLI_QUALITY'])
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(
+        options['GZIP_LEVEL'], zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return compressor.compress, compressor.flush
+
+
+def _compress_stream(chunks, encoding, options):
+    compress, flush = _compressor(encoding, options)
+    bytes_in = bytes_out = 0
+    seconds = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        data = compress(chunk)
+        seconds += time.perf_counter() - start
+        bytes_in += len(chunk)
+        bytes_out += len(data)
+        if data:
+            yield data
+    start = time.perf_counter()
+    data = flush()
+    seconds += time.perf_counter() - start
+    bytes_out += len(data)
+    stats.record(encoding, bytes_in, bytes_out, seconds)
+    observe_compression(encoding, bytes_in, bytes_out, seconds)
+    yield data
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip or brotli as the client accepts."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        options = _settings()
+
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(options['SKIP_CONTENT_TYPES']):
+            return response
+        if not response.streaming and \
+                len(response.content) < options['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = _compress_stream(
+                response.streaming_content, encoding, options)
+            del response['Content-Length']
+        else:
+            compressed = b''.join(
+                _compress_stream([response.content], encoding, options))
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,67 @@
+"""
+Denormalized recipe counts on tags and ingredients.
+
+``Tag.recipe_count`` and ``Ingredient.recipe_count`` are kept in step
+with the recipe links by the m2m_changed and pre_delete handlers in
+recipe.signals, inside the same transaction as the change. Writes that
+bypass signals (bulk imports) adjust the counts themselves, and the
+reconcile_recipe_counts command repairs any drift.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Ingredient, Recipe, Tag
+
+COUNTED_FIELDS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+def recipe_links(model):
+    """Return the through model linking recipes to `model` and the
+    column holding `model`'s id."""
+    field = Recipe._meta.get_field(COUNTED_FIELDS[model])
+    return field.remote_field.through, field.m2m_reverse_name()
+
+
+def adjust_recipe_counts(model, deltas):
+    """Add {pk: delta} to recipe counts, one UPDATE per distinct delta.
+
+    Counts never go below zero; a drifted count is left for
+    reconcile_recipe_counts rather than failing the write.
+    """
+    pks_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            pks_by_delta[delta].append(pk)
+    for delta, pks in pks_by_delta.items():
+        count = F('recipe_count') + delta
+        if delta < 0:
+            count = Greatest(count, 0)
+        model.objects.filter(pk__in=pks).update(recipe_count=count)
+
+
+def actual_recipe_count(model):
+    """Expression counting the recipes linked to each `model` row."""
+    through, column = recipe_links(model)
+    counts = through.objects.filter(**{column: OuterRef('pk')}).values(
+        column).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def reconcile_recipe_counts(model, fix=True):
+    """Find rows whose recipe count has drifted, recounting them if
+    `fix` is set. Returns the number of drifted rows."""
+    drifted = list(
+        model.objects.annotate(actual=actual_recipe_count(model))
+        .exclude(recipe_count=F('actual')).values_list('pk', flat=True)
+    )
+    if fix and drifted:
+        # Recount in the UPDATE itself so links changed since the scan
+        # are not overwritten with a stale count.
+        model.objects.filter(pk__in=drifted).update(
+            recipe_count=actual_recipe_count(model))
+    return len(drifted)
@@ -0,0 +1,142 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+
+``CONN_HEALTH_CHECKS`` is backported from Django 4.1: a persistent
+connection (``CONN_MAX_AGE`` > 0) is checked with ``SELECT 1`` before
+its first use in each request, and replaced if the server has gone
+away, instead of failing the request.
+
+With ``POOL['MAX_SIZE']`` > 0, connections are checked out of a
+`ConnectionPool` shared by the threads of the process rather than
+opened, and closing one returns it to the pool. ``CONN_MAX_AGE`` must
+then be 0, so that connections go back to the pool after each request
+rather than staying with their thread. Pooled connections are health
+checked on checkout instead.
+"""
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pools():
+    """Return the pools of this process by name."""
+    with _pools_lock:
+        return {pool.name: pool for pool in _pools.values()}
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process."""
+    for pool in get_pools().values():
+        pool.closeall()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the database from dropping.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    health_check_enabled = False
+    health_check_done = False
+    _pool_in_use = None
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        options = settings_dict.get('POOL') or {}
+        if options.get('MAX_SIZE') and settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(
+                'POOL needs CONN_MAX_AGE = 0, or threads keep their pooled '
+                'connections between requests and exhaust the pool.')
+        super().__init__(settings_dict, *args, **kwargs)
+
+    def _pool(self, conn_params):
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('MAX_SIZE'):
+            return None
+        # Tests switch NAME to the test database, key on the parameters.
+        key = (self.alias, tuple(sorted(
+            (name, str(value)) for name, value in conn_params.items())))
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    f"{self.alias}:{conn_params.get('database', '')}",
+                    options['MAX_SIZE'],
+                    options.get('TIMEOUT', 10),
+                    pre_ping=self.settings_dict.get(
+                        'CONN_HEALTH_CHECKS', False),
+                )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        pool = self._pool(conn_params)
+        self._pool_in_use = pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection, reused = pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params))
+        if reused:
+            self.isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        pool = self._pool_in_use
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def connect(self):
+        super().connect()
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False)
+        # New connections are healthy, pooled ones were checked out.
+        self.health_check_done = True
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it is unusable, once per request."""
+        if self.connection is None or not self.health_check_enabled or \
+                self.health_check_done:
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def close_if_unusable_or_obsolete(self):
+        if self.connection is not None:
+            self.health_check_done = False
+            # If the application didn't restore the original autocommit
+            # setting, don't take chances, drop the connection.
+            if self.get_autocommit() != self.settings_dict['AUTOCOMMIT']:
+                self.close()
+                return
+            # If an exception other than DataError or IntegrityError
+            # occurred since the last commit / rollback, check if the
+            # connection works.
+            if self.errors_occurred:
+                if self.is_usable():
+                    self.errors_occurred = False
+                    self.health_check_done = True
+                else:
+                    self.close()
+                    return
+            if self.close_at is not None and \
+                    time.monotonic() >= self.close_at:
+                self.close()
+                return
@@ -0,0 +1,167 @@
+"""
+In-process pool of psycopg2 connections for threaded servers.
+
+Caps the connections a process opens at ``max_size``. Threads asking
+for a connection when all are checked out wait up to ``timeout``
+seconds for one to be returned, then fail with `PoolTimeout`.
+Connections are returned rolled back, and those that are closed or
+cannot be rolled back are dropped. With ``pre_ping`` an idle connection
+is checked with ``SELECT 1`` before it is handed out again.
+"""
+import threading
+import time
+from collections import deque
+
+from psycopg2 import Error, OperationalError, extensions
+
+from core.metrics import (
+    count_pool_timeout,
+    observe_pool_checkout,
+    set_pool_connections,
+)
+
+
+class PoolTimeout(OperationalError):
+    """No connection was returned to the pool in time."""
+
+
+def _ping(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Error:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Thread safe pool of connections made by a `connect` callable."""
+
+    def __init__(self, name, max_size, timeout, pre_ping=False):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self._idle = deque()
+        self._in_use = set()
+        # Checked out connections to close on return, see closeall().
+        self._closing = set()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'created': 0, 'discarded': 0, 'checkouts': 0, 'timeouts': 0,
+            'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+        }
+
+    def getconn(self, connect):
+        """Check out a connection, returning it and whether it was reused.
+
+        `connect()` opens a new connection when the pool has room.
+        """
+        start = time.monotonic()
+        while True:
+            connection = self._checkout(start)
+            if connection is None:
+                break
+            if not self.pre_ping or _ping(connection):
+                self._record_checkout(start, connection)
+                return connection, True
+            self._discard(connection)
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        self._record_checkout(start, connection)
+        return connection, False
+
+    def _checkout(self, start):
+        """Take an idle connection, or None once room for a new one is
+        reserved."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    count_pool_timeout(self.name)
+                    raise PoolTimeout(
+                        f'No connection available in pool {self.name} '
+                        f'after {self.timeout}s.')
+                self._cond.wait(remaining)
+
+    def _record_checkout(self, start, connection):
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use.add(connection)
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(
+                self._stats['max_wait_seconds'], waited)
+            in_use, idle = self._size - len(self._idle), len(self._idle)
+        observe_pool_checkout(self.name, waited)
+        set_pool_connections(self.name, in_use, idle)
+
+    def putconn(self, connection):
+        """Return a checked out connection to the pool."""
+        with self._cond:
+            self._in_use.discard(connection)
+            closing = connection in self._closing
+            self._closing.discard(connection)
+        if closing:
+            self._discard(connection)
+            return
+        if not connection.closed and connection.info.transaction_status != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Error:
+                pass
+        if connection.closed or connection.info.transaction_status != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append(connection)
+            self._cond.notify()
+            in_use, idle = self._size - len(self._idle), len(self._idle)
+        set_pool_connections(self.name, in_use, idle)
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def closeall(self):
+        """Close the idle connections, and the checked out ones when they
+        are returned instead of pooling them again."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._closing.update(self._in_use)
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self._stats,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+            }
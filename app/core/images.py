@@ -0,0 +1,95 @@
+"""
+Resized renditions of recipe images.
+
+Each uploaded image gets one rendition per size in
+``settings.RECIPE_IMAGE_RENDITIONS`` and format in
+``settings.RECIPE_IMAGE_FORMATS``, stored next to the original as
+``<name>_<size>.<ext>``. Rendition names are derived from the original's
+name, so URLs can be built without touching storage.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': ('WEBP', '.webp'),
+    'jpeg': ('JPEG', '.jpg'),
+}
+
+
+def rendition_name(image_name, size, fmt):
+    base = os.path.splitext(image_name)[0]
+    return f'{base}_{size}{FORMATS[fmt][1]}'
+
+
+def rendition_names(image_name):
+    """Yield (size, format, name) for every configured rendition."""
+    for size in settings.RECIPE_IMAGE_RENDITIONS:
+        for fmt in settings.RECIPE_IMAGE_FORMATS:
+            yield size, fmt, rendition_name(image_name, size, fmt)
+
+
+def rendition_urls(image_name, storage=default_storage):
+    """Return {size: {format: url}} for an image."""
+    urls = {}
+    for size, fmt, name in rendition_names(image_name):
+        urls.setdefault(size, {})[fmt] = storage.url(name)
+    return urls
+
+
+def _encode(image, fmt):
+    pil_format = FORMATS[fmt][0]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format=pil_format,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=pil_format == 'JPEG',
+    )
+    return buffer.getvalue()
+
+
+def generate_renditions(image_name, storage=default_storage, force=False):
+    """Create missing renditions of an image, returning their names.
+
+    Existing renditions are kept unless `force` is set, so calling this
+    again for the same image is cheap.
+    """
+    todo = [
+        (size, fmt, name) for size, fmt, name in rendition_names(image_name)
+        if force or not storage.exists(name)
+    ]
+    if not todo:
+        return []
+
+    with storage.open(image_name, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+
+    created = []
+    resized = {}
+    for size, fmt, name in todo:
+        if size not in resized:
+            image = original.copy()
+            image.thumbnail(
+                settings.RECIPE_IMAGE_RENDITIONS[size], Image.LANCZOS)
+            resized[size] = image
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(_encode(resized[size], fmt)))
+        created.append(name)
+    return created
+
+
+def delete_renditions(image_name, storage=default_storage):
+    for _, _, name in rendition_names(image_name):
+        if storage.exists(name):
+            storage.delete(name)
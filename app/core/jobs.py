@@ -0,0 +1,114 @@
+"""
+Database backed queue for recipe image processing.
+
+Uploads enqueue an ImageJob and return straight away. The
+process_image_jobs management command claims pending jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of workers can
+poll the same table without handing out a job twice, and runs the
+CPU bound image work in a process pool.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.images import generate_renditions
+from core.metrics import observe_image_job
+from core.models import ImageJob, Recipe
+
+logger = logging.getLogger(__name__)
+
+
+def _set_image_status(recipe_id, image, image_status):
+    """Update a recipe's image status unless it has a newer image."""
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image).first()
+    if recipe is not None:
+        recipe.image_status = image_status
+        recipe.save(update_fields=['image_status', 'updated_at'])
+
+
+def enqueue_image_job(recipe):
+    """Queue processing of the recipe's current image."""
+    job = ImageJob.objects.create(
+        recipe=recipe,
+        image=recipe.image.name,
+        max_attempts=settings.IMAGE_JOB_MAX_ATTEMPTS,
+    )
+    recipe.image_status = 'pending'
+    recipe.save(update_fields=['image_status', 'updated_at'])
+    return job
+
+
+def claim_jobs(limit, stale_after=None):
+    """Mark up to `limit` runnable jobs as running and return them.
+
+    Jobs left running for longer than `stale_after` seconds are assumed
+    to belong to a dead worker and are claimed again.
+    """
+    now = timezone.now()
+    if stale_after is None:
+        stale_after = settings.IMAGE_JOB_STALE_AFTER
+    runnable = Q(status=ImageJob.PENDING, run_after__lte=now) | Q(
+        status=ImageJob.RUNNING,
+        locked_at__lt=now - timedelta(seconds=stale_after),
+    )
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(runnable).order_by('run_after')[:limit]
+        )
+        ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ImageJob.RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    for job in jobs:
+        job.status = ImageJob.RUNNING
+        job.locked_at = now
+        job.attempts += 1
+        _set_image_status(job.recipe_id, job.image, 'processing')
+    return jobs
+
+
+def process_image(image_name):
+    """Generate renditions for an image, returning the time it took.
+
+    Runs in pool worker processes and does not touch the database.
+    """
+    start = time.monotonic()
+    generate_renditions(image_name)
+    return time.monotonic() - start
+
+
+def complete_job(job, duration):
+    job.status = ImageJob.DONE
+    job.finished_at = timezone.now()
+    job.duration = duration
+    job.last_error = ''
+    job.save(update_fields=[
+        'status', 'finished_at', 'duration', 'last_error'])
+    _set_image_status(job.recipe_id, job.image, 'ready')
+    observe_image_job('done', duration)
+
+
+def fail_job(job, error):
+    """Record a failed attempt, retrying with exponential backoff."""
+    job.last_error = str(error)
+    if job.attempts >= job.max_attempts:
+        job.status = ImageJob.FAILED
+        job.finished_at = timezone.now()
+        _set_image_status(job.recipe_id, job.image, 'failed')
+        observe_image_job('failed')
+    else:
+        job.status = ImageJob.PENDING
+        delay = settings.IMAGE_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+        observe_image_job('retry')
+    job.save(update_fields=[
+        'status', 'finished_at', 'last_error', 'run_after'])
+    logger.warning('Image job %s failed (attempt %s/%s): %s',
+                   job.pk, job.attempts, job.max_attempts, error)
@@ -0,0 +1,105 @@
+"""
+Django command to compare JSON renderers on large recipe payloads.
+"""
+import datetime
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONRenderer, orjson
+
+RENDERERS = {
+    'stdlib': JSONRenderer,
+    'orjson': ORJSONRenderer,
+}
+
+
+def recipe_payload(count, raw=False):
+    """Build a list response shaped like the recipe detail serializer's.
+
+    Serializers hand the renderer prices and datetimes as strings, `raw`
+    leaves them as Decimal and datetime to exercise the fallbacks.
+    """
+    now = timezone.now()
+    payload = {
+        'next': None,
+        'previous': None,
+        'results': [
+            {
+                'id': n,
+                'title': f'Recipe {n}',
+                'time_minutes': n % 90,
+                'price': Decimal(n % 10000) / 100,
+                'link': f'https://example.com/recipes/{n}',
+                'tags': [
+                    {'id': n * 3 + i, 'name': f'Tag {i}'} for i in range(3)
+                ],
+                'ingredients': [
+                    {'id': n * 5 + i, 'name': f'Ingredient {i}'}
+                    for i in range(5)
+                ],
+                'description': 'Mix everything together. ' * 10,
+                'updated_at': now - datetime.timedelta(minutes=n),
+            }
+            for n in range(count)
+        ],
+    }
+    if not raw:
+        for recipe in payload['results']:
+            recipe['price'] = str(recipe['price'])
+            recipe['updated_at'] = recipe['updated_at'].isoformat()
+    return payload
+
+
+def measure(renderer, data, runs):
+    """Return median encode time in ms, peak traced memory in bytes and
+    output size."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = renderer.render(data)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    renderer.render(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak, len(output)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark encode time and peak memory of the JSON renderers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed, both renderers '
+                              'will use the stdlib.')
+        for size in options['sizes']:
+            for raw in (False, True):
+                self._compare(size, raw, options['runs'])
+
+    def _compare(self, size, raw, runs):
+        data = recipe_payload(size, raw)
+        kind = 'raw Decimal/datetime' if raw else 'serialized'
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f'{size} recipes, {kind}'))
+        results = {
+            name: measure(renderer(), data, runs)
+            for name, renderer in RENDERERS.items()
+        }
+        for name, (ms, peak, length) in results.items():
+            self.stdout.write(
+                f'  {name:7} {ms:9.2f} ms  peak {peak / 2 ** 20:7.2f} MiB'
+                f'  output {length / 2 ** 20:6.2f} MiB'
+            )
+        speedup = results['stdlib'][0] / results['orjson'][0]
+        self.stdout.write(f'  orjson is {speedup:.1f}x faster')
@@ -0,0 +1,144 @@
+"""
+Django command to compare query plans with and without the composite
+indexes on recipes, tags and ingredients.
+
+Everything runs in one transaction that is rolled back at the end, so
+the seeded rows and dropped indexes never become visible. Dropping an
+index still locks its table until then: run this against a development
+database.
+"""
+import statistics
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Ingredient, Recipe, Tag
+from core.slowqueries import plan_nodes
+
+
+def _index(model, name):
+    return next(i for i in model._meta.indexes if i.name == name)
+
+
+def _constraint(model, name):
+    return next(c for c in model._meta.constraints if c.name == name)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot list queries with and without their indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument(
+            '--recipes', type=int, default=2000,
+            help='Recipes seeded per user.',
+        )
+        parser.add_argument(
+            '--names', type=int, default=500,
+            help='Tags and ingredients seeded per user.',
+        )
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument(
+            '--runs', type=int, default=5,
+            help='Executions per query, the median is reported.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, sparse = self._seed(options)
+            queries = self._queries(user, sparse, options['page_size'])
+
+            with_indexes = self._explain_all(queries, options['runs'])
+            self._drop_indexes()
+            without_indexes = self._explain_all(queries, options['runs'])
+
+            transaction.set_rollback(True)
+
+        for name in queries:
+            before_ms, before_plan = without_indexes[name]
+            after_ms, after_plan = with_indexes[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  without: {before_ms:8.3f} ms  {before_plan}')
+            self.stdout.write(f'  with:    {after_ms:8.3f} ms  {after_plan}')
+
+    def _seed(self, options):
+        self.stdout.write(
+            f"Seeding {options['users']} users with {options['recipes']} "
+            f"recipes and {options['names']} tags/ingredients each..."
+        )
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'bench{n}@example.com', name='bench')
+            for n in range(options['users'] + 1)
+        )
+        # The first user has a few old recipes: the worst case for
+        # walking the primary key backwards until a page is filled.
+        sparse, users = users[0], users[1:]
+        recipes = [
+            Recipe(user=sparse, title=f'Recipe {n}', time_minutes=10, price=5)
+            for n in range(max(options['recipes'] // 20, 1))
+        ]
+        # Interleave users so each one's rows are spread over the table.
+        recipes += (
+            Recipe(user=user, title=f'Recipe {n}', time_minutes=10, price=5)
+            for n in range(options['recipes']) for user in users
+        )
+        Recipe.objects.bulk_create(recipes, batch_size=1000)
+        for model in (Tag, Ingredient):
+            model.objects.bulk_create(
+                (
+                    model(user=user, name=f'{model.__name__} {n}')
+                    for n in range(options['names']) for user in users
+                ),
+                batch_size=1000,
+            )
+        with connection.cursor() as cursor:
+            # Fire the deferred FK checks now, Postgres refuses to alter
+            # a table with pending trigger events.
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            for model in (Recipe, Tag, Ingredient):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+        return users[0], sparse
+
+    def _queries(self, user, sparse, page_size):
+        names = [f'Tag {n}' for n in range(0, 50, 5)]
+        recipes = Recipe.objects.defer('search_vector').order_by('-id')
+        return {
+            'recipe list': recipes.filter(user=user)[:page_size],
+            'recipe list, user with few old recipes': recipes.filter(
+                user=sparse)[:page_size],
+            'tag list': Tag.objects.filter(user=user)
+            .order_by('-name')[:page_size],
+            'ingredient list': Ingredient.objects.filter(user=user)
+            .order_by('-name')[:page_size],
+            'tag lookup by name': Tag.objects.filter(
+                user=user, name__in=names),
+        }
+
+    def _drop_indexes(self):
+        with connection.schema_editor() as editor:
+            editor.remove_index(
+                Recipe, _index(Recipe, 'recipe_user_id_idx'))
+            editor.remove_constraint(
+                Tag, _constraint(Tag, 'unique_tag_per_user'))
+            editor.remove_constraint(
+                Ingredient,
+                _constraint(Ingredient, 'unique_ingredient_per_user'))
+
+    def _explain_all(self, queries, runs):
+        return {
+            name: self._explain(queryset, runs)
+            for name, queryset in queries.items()
+        }
+
+    def _explain(self, queryset, runs):
+        sql, params = queryset.query.sql_with_params()
+        timings = []
+        with connection.cursor() as cursor:
+            for _ in range(runs):
+                cursor.execute(
+                    'EXPLAIN (ANALYZE, FORMAT JSON) ' + sql, params)
+                result = cursor.fetchone()[0][0]
+                timings.append(result['Execution Time'])
+        plan = ' > '.join(plan_nodes(result['Plan']))
+        return statistics.median(timings), plan
@@ -0,0 +1,33 @@
+"""
+Django command to generate recipe image renditions.
+"""
+from django.core.management.base import BaseCommand
+
+from core.images import generate_renditions
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate missing renditions for existing recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate renditions that already exist.',
+        )
+
+    def handle(self, *args, **options):
+        images = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('image', flat=True)
+        created = failed = 0
+        for image_name in images.iterator():
+            try:
+                created += len(
+                    generate_renditions(image_name, force=options['force']))
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'{image_name}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} renditions, {failed} images failed.'))
@@ -0,0 +1,146 @@
+"""
+Django command to run the recipe image processing worker.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from core.jobs import (
+    claim_jobs,
+    complete_job,
+    fail_job,
+    process_image,
+)
+
+
+class InlineExecutor:
+    """Runs jobs in the current process, for --workers 0."""
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Process queued recipe image jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Size of the process pool, 0 to run jobs in-process.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Jobs claimed per poll, defaults to twice the workers.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to sleep when the queue is empty.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        self.workers = workers = options['workers']
+        batch_size = options['batch_size'] or max(workers, 1) * 2
+        self.executor = self._make_executor(workers)
+
+        self.processed = self.failed = 0
+        self.busy = 0.0
+        started = time.monotonic()
+        try:
+            while True:
+                jobs = claim_jobs(batch_size)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                self._run_batch(jobs)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=True)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {self.processed} jobs, {self.failed} failed, '
+            f'in {elapsed:.1f}s '
+            f'({self.processed / elapsed if elapsed else 0:.1f} jobs/s, '
+            f'{self.busy:.1f}s of image processing).'
+        ))
+
+    def _make_executor(self, workers):
+        if not workers:
+            return InlineExecutor()
+        # Forked pool processes must not share the parent's socket.
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+        )
+
+    def _replace_executor(self):
+        self.executor.shutdown(wait=True)
+        self.executor = self._make_executor(self.workers)
+
+    def _run_batch(self, jobs):
+        start = time.monotonic()
+        crashed = self._run(jobs)
+        if crashed:
+            # A worker died (e.g. killed for memory), which breaks the
+            # whole pool and every unfinished job with it. Run those
+            # jobs one at a time to find the one that kills its worker;
+            # only that one is charged the attempt.
+            self.stderr.write(
+                f'A worker process died, rerunning {len(crashed)} jobs '
+                f'one at a time.')
+            self._replace_executor()
+            for job in crashed:
+                if self._run([job]):
+                    self.failed += 1
+                    fail_job(job, 'Worker process died')
+                    self._replace_executor()
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f'Batch of {len(jobs)} jobs in {elapsed:.2f}s '
+            f'({len(jobs) / elapsed if elapsed else 0:.1f} jobs/s)'
+        )
+
+    def _run(self, jobs):
+        """Run `jobs` in the pool, returning those lost to a broken pool.
+        """
+        crashed = []
+        futures = {
+            self.executor.submit(process_image, job.image): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                duration = future.result()
+            except BrokenProcessPool:
+                crashed.append(job)
+            except Exception as exc:
+                self.failed += 1
+                fail_job(job, exc)
+            else:
+                self.processed += 1
+                self.busy += duration
+                complete_job(job, duration)
+        return crashed
@@ -0,0 +1,27 @@
+"""
+Django command to repair drifted tag and ingredient recipe counts.
+"""
+from django.core.management.base import BaseCommand
+
+from core.counters import COUNTED_FIELDS, reconcile_recipe_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount recipes per tag and ingredient, fixing any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report drifted counts.',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['dry_run']
+        for model in COUNTED_FIELDS:
+            drifted = reconcile_recipe_counts(model, fix=fix)
+            name = model._meta.verbose_name
+            if fix:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Fixed {drifted} {name} recipe counts.'))
+            else:
+                self.stdout.write(f'Found {drifted} drifted {name} counts.')
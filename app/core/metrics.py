@@ -0,0 +1,190 @@
+"""
+Prometheus metrics.
+
+Values are recorded through the functions below and served in the
+Prometheus text format by `metrics_view` on ``/metrics``.
+``MetricsMiddleware`` records the latency and SQL query count of every
+request, labelled with the ``ViewClass.action`` that handled it.
+
+Prefork servers: set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory
+shared by every web and image worker process before they start. Each
+process then writes its values to files there, and a scrape of any one
+worker adds up all of them. With gunicorn, call
+``prometheus_client.multiprocess.mark_process_dead(worker.pid)`` from
+the ``child_exit`` hook.
+
+Recording does nothing when prometheus_client is not installed.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core.querybudget import QueryCounter
+from core.timing import view_name
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        'api_request_duration_seconds',
+        'Time spent handling requests.',
+        ['view', 'method', 'status'],
+        buckets=(.005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5,
+                 10),
+    )
+    REQUEST_QUERIES = prometheus_client.Histogram(
+        'api_request_db_queries',
+        'SQL queries run per request.',
+        ['view'],
+        buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55),
+    )
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        'cache_lookups',
+        'Cache lookups by cache and result, hit or miss.',
+        ['cache', 'result'],
+    )
+    IMAGE_JOB_DURATION = prometheus_client.Histogram(
+        'image_job_duration_seconds',
+        'Time spent generating the renditions of an image.',
+        buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60),
+    )
+    IMAGE_JOBS = prometheus_client.Counter(
+        'image_jobs',
+        'Image job attempts by outcome.',
+        ['status'],
+    )
+    COMPRESSED_RESPONSES = prometheus_client.Counter(
+        'compressed_responses',
+        'Responses compressed by encoding.',
+        ['encoding'],
+    )
+    COMPRESSION_BYTES = prometheus_client.Counter(
+        'compression_bytes',
+        'Bytes before (in) and after (out) compression.',
+        ['encoding', 'direction'],
+    )
+    COMPRESSION_SECONDS = prometheus_client.Counter(
+        'compression_seconds',
+        'Time spent compressing responses.',
+        ['encoding'],
+    )
+    DB_POOL_WAIT = prometheus_client.Histogram(
+        'db_pool_checkout_wait_seconds',
+        'Time spent waiting to check out a pooled DB connection.',
+        ['pool'],
+        buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 10),
+    )
+    DB_POOL_TIMEOUTS = prometheus_client.Counter(
+        'db_pool_timeouts',
+        'Checkouts that gave up waiting for a pooled DB connection.',
+        ['pool'],
+    )
+    DB_POOL_CONNECTIONS = prometheus_client.Gauge(
+        'db_pool_connections',
+        'Pooled DB connections by state, in use or idle.',
+        ['pool', 'state'],
+        multiprocess_mode='livesum',
+    )
+
+
+def observe_request(view, method, status, seconds, queries):
+    if prometheus_client is None:
+        return
+    REQUEST_LATENCY.labels(view, method, status).observe(seconds)
+    REQUEST_QUERIES.labels(view).observe(queries)
+
+
+def count_cache_lookup(cache, hit):
+    if prometheus_client is None:
+        return
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_image_job(status, seconds=None):
+    if prometheus_client is None:
+        return
+    IMAGE_JOBS.labels(status).inc()
+    if seconds is not None:
+        IMAGE_JOB_DURATION.observe(seconds)
+
+
+def observe_compression(encoding, bytes_in, bytes_out, seconds):
+    if prometheus_client is None:
+        return
+    COMPRESSED_RESPONSES.labels(encoding).inc()
+    COMPRESSION_BYTES.labels(encoding, 'in').inc(bytes_in)
+    COMPRESSION_BYTES.labels(encoding, 'out').inc(bytes_out)
+    COMPRESSION_SECONDS.labels(encoding).inc(seconds)
+
+
+def observe_pool_checkout(pool, seconds):
+    if prometheus_client is None:
+        return
+    DB_POOL_WAIT.labels(pool).observe(seconds)
+
+
+def count_pool_timeout(pool):
+    if prometheus_client is None:
+        return
+    DB_POOL_TIMEOUTS.labels(pool).inc()
+
+
+def set_pool_connections(pool, in_use, idle):
+    if prometheus_client is None:
+        return
+    DB_POOL_CONNECTIONS.labels(pool, 'in_use').set(in_use)
+    DB_POOL_CONNECTIONS.labels(pool, 'idle').set(idle)
+
+
+class MetricsMiddleware:
+    """Record the latency and query count of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if prometheus_client is None:
+            return self.get_response(request)
+        request._metrics_view = 'unresolved'
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        observe_request(
+            request._metrics_view, request.method, response.status_code,
+            time.perf_counter() - start, counter.count,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_name(view_func, request.method)
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def metrics_view(request):
+    """Serve the metrics, behind a bearer token if METRICS_TOKEN is set."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    if prometheus_client is None:
+        return HttpResponse(
+            'prometheus_client is not installed.', status=503,
+            content_type='text/plain')
+    return HttpResponse(
+        prometheus_client.generate_latest(_registry()),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
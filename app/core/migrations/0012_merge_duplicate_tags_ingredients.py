@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, model_name, field_name):
+    """Merge each user's same-named rows into the oldest one.
+
+    Recipes linked to a duplicate are relinked to the kept row before
+    the duplicate is deleted, so no recipe loses a tag or ingredient.
+    """
+    model = apps.get_model('core', model_name)
+    recipe = apps.get_model('core', 'Recipe')
+    through = recipe._meta.get_field(field_name).remote_field.through
+    fk = f'{model_name.lower()}_id'
+
+    groups = (
+        model.objects.values('user_id', 'name')
+        .annotate(count=Count('id'), keep=Min('id'))
+        .filter(count__gt=1)
+    )
+    for group in groups.iterator():
+        duplicates = list(
+            model.objects.filter(user_id=group['user_id'], name=group['name'])
+            .exclude(id=group['keep']).values_list('id', flat=True)
+        )
+        links = through.objects.filter(**{f'{fk}__in': duplicates})
+        recipe_ids = set(links.values_list('recipe_id', flat=True))
+        linked = set(
+            through.objects.filter(**{fk: group['keep']})
+            .values_list('recipe_id', flat=True)
+        )
+        links.delete()
+        through.objects.bulk_create([
+            through(recipe_id=recipe_id, **{fk: group['keep']})
+            for recipe_id in recipe_ids - linked
+        ])
+        model.objects.filter(id__in=duplicates).delete()
+
+
+def merge_duplicate_tags_ingredients(apps, schema_editor):
+    merge_duplicates(apps, 'Tag', 'tags')
+    merge_duplicates(apps, 'Ingredient', 'ingredients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_image_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_tags_ingredients,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_user_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            sql=[
+                '''
+                UPDATE core_tag SET recipe_count = (
+                    SELECT COUNT(*) FROM core_recipe_tags
+                    WHERE core_recipe_tags.tag_id = core_tag.id
+                );
+                ''',
+                '''
+                UPDATE core_ingredient SET recipe_count = (
+                    SELECT COUNT(*) FROM core_recipe_ingredients
+                    WHERE core_recipe_ingredients.ingredient_id
+                        = core_ingredient.id
+                );
+                ''',
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', 'name'], name='ingredient_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', 'name'], name='tag_assigned_idx'),
+        ),
+    ]
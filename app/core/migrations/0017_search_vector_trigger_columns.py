@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Only recompute the search vector when the searched columns change, not
+# on every image_status or updated_at write.
+TRIGGER_ON_SEARCHED_COLUMNS = '''
+DROP TRIGGER core_recipe_search_vector_trigger ON core_recipe;
+CREATE TRIGGER core_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+    FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_update();
+'''
+
+TRIGGER_ON_ANY_UPDATE = '''
+DROP TRIGGER core_recipe_search_vector_trigger ON core_recipe;
+CREATE TRIGGER core_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON core_recipe
+    FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_update();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_slow_query'),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGGER_ON_SEARCHED_COLUMNS, TRIGGER_ON_ANY_UPDATE),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin
 )
 from django.conf import settings
+from django.utils import timezone
 import uuid
 import os
 
@@ -58,6 +61,25 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=[
+            ('pending', 'Pending'),
+            ('processing', 'Processing'),
+            ('ready', 'Ready'),
+            ('failed', 'Failed'),
+        ],
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger from title and description.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -69,6 +91,21 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # Maintained by core.counters.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_tag_per_user'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                name='tag_assigned_idx',
+                condition=models.Q(recipe_count__gt=0),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -80,6 +117,83 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # Maintained by core.counters.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_ingredient_per_user'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                name='ingredient_assigned_idx',
+                condition=models.Q(recipe_count__gt=0),
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ImageJob(models.Model):
+    """Queued processing of an uploaded recipe image."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs'
+    )
+    image = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        default=PENDING,
+        choices=[
+            (PENDING, 'Pending'),
+            (RUNNING, 'Running'),
+            (DONE, 'Done'),
+            (FAILED, 'Failed'),
+        ],
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+    duration = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['run_after'],
+                name='imagejob_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.image} ({self.status})'
+
+
+class SlowQuery(models.Model):
+    """A query that ran longer than the slow query threshold."""
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    duration = models.FloatField()
+    view = models.CharField(max_length=255, blank=True)
+    path = models.CharField(max_length=255, blank=True)
+    plan = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'slow queries'
+
+    def __str__(self):
+        return f'{self.duration * 1000:.0f} ms in {self.view or self.path}'
@@ -0,0 +1,99 @@
+"""
+Query budgets for views.
+
+A budget declares the maximum number of SQL queries a view is allowed to
+run. Going over the budget raises ``QueryBudgetExceeded`` when
+``settings.QUERY_BUDGET_RAISE`` is on (tests, development) and is logged
+as a warning otherwise.
+
+Budgets can be declared on a function with the ``query_budget``
+decorator, or on a view class with a ``query_budget`` attribute which is
+either an int or a dict mapping viewset action names to ints. The class
+attribute is enforced by ``QueryBudgetMiddleware``, which also reports
+the number of queries in an ``X-Query-Count`` response header when
+``settings.QUERY_COUNT_HEADER`` is on.
+"""
+import functools
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a view runs more queries than its budget allows."""
+
+
+class QueryCounter:
+    """Context manager counting queries on the default connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+
+def check_budget(name, count, budget):
+    """Raise or log if `count` queries is over `budget`."""
+    if budget is None or count <= budget:
+        return
+    msg = f'{name} ran {count} queries, budget is {budget}'
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(msg)
+    logger.warning(msg)
+
+
+def query_budget(max_queries):
+    """Decorator enforcing a query budget on a function or method."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with QueryCounter() as counter:
+                result = func(*args, **kwargs)
+            check_budget(func.__qualname__, counter.count, max_queries)
+            return result
+        return wrapper
+    return decorator
+
+
+def get_view_budget(view_func, method):
+    """Return the budget declared on a resolved view, if any."""
+    view_class = getattr(view_func, 'cls', None) or \
+        getattr(view_func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(method.lower())
+        return budget.get(action)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """Enforce `query_budget` declared on view classes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._query_budget = None
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        check_budget(request.path, counter.count, request._query_budget)
+        if getattr(settings, 'QUERY_COUNT_HEADER', False):
+            response['X-Query-Count'] = str(counter.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_view_budget(view_func, request.method)
@@ -0,0 +1,49 @@
+"""
+JSON rendering with orjson.
+
+ORJSONRenderer produces the same bytes as DRF's JSONRenderer for the
+compact, unicode output the API uses. Types orjson does not handle
+natively (Decimal, lazy strings, querysets, ...) and datetimes go
+through DRF's JSONEncoder, so their representation does not change
+either. Pretty printed and ASCII-only output, which orjson cannot
+produce, and environments without orjson use the stdlib renderer.
+"""
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def orjson_dumps(data):
+    """Encode `data` to JSON bytes the way DRF's JSONEncoder would."""
+    return orjson.dumps(
+        data,
+        default=_encoder.default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson where it can."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or indent is not None or self.ensure_ascii
+                or not self.compact):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        ret = orjson_dumps(data)
+        # Escape U+2028/2029 like DRF so the output stays valid
+        # JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return ret
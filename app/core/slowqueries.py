@@ -0,0 +1,206 @@
+"""
+Slow query log.
+
+``SlowQueryMiddleware`` wraps the queries of every request with a
+`SlowQueryRecorder`. Queries slower than ``THRESHOLD_MS`` are kept, and
+once the response is ready they are saved as ``SlowQuery`` rows with
+the view that ran them and their ``EXPLAIN (ANALYZE off, FORMAT JSON)``
+plan. Plans are made after the fact, so they are cheap but show the
+planner's estimates, not what actually happened. The table is a ring
+buffer: only the newest ``MAX_ROWS`` rows are kept.
+
+Query parameters can hold secrets such as token keys and password
+hashes, and the table is visible to staff, so only their types and
+lengths are kept unless ``CAPTURE_PARAMS`` is set. Plans show the values
+as literals in their conditions, so without ``CAPTURE_PARAMS`` they are
+reduced to their shape: node types, relations, indexes and estimates.
+Queries touching ``SENSITIVE_TABLES`` never keep their parameters or
+plan.
+
+Queries run while streaming a response are not seen.
+"""
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from core.models import SlowQuery
+from core.timing import view_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 200,
+    'MAX_ROWS': 1000,
+    'MAX_PER_REQUEST': 5,
+    'EXPLAIN': True,
+    'CAPTURE_PARAMS': False,
+    'SENSITIVE_TABLES': ('core_user', 'authtoken_token', 'django_session'),
+}
+
+EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'with')
+
+# Plan node keys that never hold query values.
+PLAN_SHAPE_KEYS = {
+    'Node Type', 'Parent Relationship', 'Relation Name', 'Schema', 'Alias',
+    'Index Name', 'Scan Direction', 'Join Type', 'Strategy', 'Partial Mode',
+    'Operation', 'Command', 'Subplan Name', 'CTE Name', 'Parallel Aware',
+    'Async Capable', 'Inner Unique', 'Startup Cost', 'Total Cost',
+    'Plan Rows', 'Plan Width', 'Workers Planned',
+}
+
+
+def _settings():
+    return {**DEFAULTS, **getattr(settings, 'SLOW_QUERY_LOG', {})}
+
+
+def plan_nodes(plan):
+    """Yield a short description of every node of an EXPLAIN plan."""
+    node = plan['Node Type']
+    if 'Relation Name' in plan:
+        node += f" on {plan['Relation Name']}"
+    if 'Index Name' in plan:
+        node += f" using {plan['Index Name']}"
+    yield node
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def describe_params(params):
+    """Describe query parameters by type and length, without values."""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return repr({name: _describe(value)
+                     for name, value in params.items()})
+    return repr(tuple(_describe(value) for value in params))
+
+
+def _describe(value):
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def touches(sql, tables):
+    """Whether `sql` refers to any of `tables`."""
+    return any(re.search(rf'\b{re.escape(table)}\b', sql)
+               for table in tables)
+
+
+def plan_shape(node):
+    """Copy of an EXPLAIN plan node without conditions, sort keys or
+    anything else that may show query values."""
+    shape = {key: value for key, value in node.items()
+             if key in PLAN_SHAPE_KEYS}
+    if 'Plans' in node:
+        shape['Plans'] = [plan_shape(child) for child in node['Plans']]
+    return shape
+
+
+class SlowQueryRecorder:
+    """Execute wrapper keeping up to `limit` queries slower than
+    `threshold` seconds as (sql, params, many, seconds)."""
+
+    def __init__(self, threshold, limit):
+        self.threshold = threshold
+        self.limit = limit
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - start
+            if seconds >= self.threshold and len(self.queries) < self.limit:
+                self.queries.append((sql, params, many, seconds))
+
+
+def explain(sql, params):
+    """Return the JSON plan of a query, or None if it has none."""
+    if not sql.lstrip()[:6].lower().startswith(EXPLAINABLE):
+        return None
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN (ANALYZE off, FORMAT JSON) ' + sql, params)
+            return cursor.fetchone()[0][0]
+    except DatabaseError:
+        return None
+
+
+def trim(max_rows):
+    """Delete all but the newest `max_rows` slow queries."""
+    oldest_kept = SlowQuery.objects.order_by('-id').values_list(
+        'id', flat=True)[max_rows:max_rows + 1]
+    ids = list(oldest_kept)
+    if ids:
+        SlowQuery.objects.filter(id__lte=ids[0]).delete()
+
+
+def record_slow_queries(queries, view='', path=''):
+    """Save (sql, params, many, seconds) `queries` as SlowQuery rows.
+
+    Queries run with executemany() are saved without params or plan.
+    """
+    options = _settings()
+    slow_queries = []
+    for sql, params, many, seconds in queries:
+        logger.warning('Slow query (%.0f ms) in %s: %s',
+                       seconds * 1000, view or path, sql)
+        sensitive = touches(sql, options['SENSITIVE_TABLES'])
+        plan = None
+        if options['EXPLAIN'] and not many and not sensitive:
+            plan = explain(sql, params)
+            if plan is not None and not options['CAPTURE_PARAMS']:
+                plan = {'Plan': plan_shape(plan['Plan'])}
+        if many or params is None:
+            saved_params = ''
+        elif sensitive:
+            saved_params = '(redacted)'
+        elif options['CAPTURE_PARAMS']:
+            saved_params = repr(params)
+        else:
+            saved_params = describe_params(params)
+        slow_queries.append(SlowQuery(
+            sql=sql,
+            params=saved_params,
+            duration=seconds,
+            view=view,
+            path=path[:255],
+            plan=plan,
+        ))
+    SlowQuery.objects.bulk_create(slow_queries)
+    trim(options['MAX_ROWS'])
+
+
+class SlowQueryMiddleware:
+    """Record the slow queries of requests, see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = _settings()
+        if not options['ENABLED']:
+            return self.get_response(request)
+
+        recorder = SlowQueryRecorder(
+            options['THRESHOLD_MS'] / 1000, options['MAX_PER_REQUEST'])
+        request._slow_query_view = ''
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if recorder.queries:
+            try:
+                record_slow_queries(
+                    recorder.queries, request._slow_query_view, request.path)
+            except DatabaseError:
+                logger.exception('Could not record slow queries')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._slow_query_view = view_name(view_func, request.method)
@@ -1,10 +1,14 @@
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Recipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -30,3 +34,21 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkQueryPlansTests(TestCase):
+
+    def test_benchmark_rolls_back(self):
+        out = StringIO()
+
+        call_command('benchmark_query_plans', users=2, recipes=5, names=5,
+                     runs=1, stdout=out)
+
+        self.assertIn('recipe list', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        with connection.cursor() as cursor:
+            get_constraints = connection.introspection.get_constraints
+            self.assertIn('recipe_user_id_idx', get_constraints(
+                cursor, Recipe._meta.db_table))
+            self.assertIn('unique_tag_per_user', get_constraints(
+                cursor, Tag._meta.db_table))
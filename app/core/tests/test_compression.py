@@ -0,0 +1,117 @@
+""" Tests for the response compression middleware """
+import gzip
+import json
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.compression import (
+    CompressionMiddleware,
+    choose_encoding,
+    stats,
+)
+
+BODY = json.dumps([{'title': f'Recipe {n}'} for n in range(200)]).encode()
+
+
+def run(response, accept='gzip, deflate, br', **headers):
+    request = RequestFactory().get(
+        '/', HTTP_ACCEPT_ENCODING=accept, **headers)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class ChooseEncodingTests(SimpleTestCase):
+
+    def test_negotiation(self):
+        self.assertEqual(choose_encoding('gzip, br'), 'br')
+        self.assertEqual(choose_encoding('gzip'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, gzip;q=0.5'), 'gzip')
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('gzip; q=0.8, br; q=0.9'), 'br')
+        self.assertEqual(choose_encoding('br;q=0, *'), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0.5, gzip;q=0'), 'br')
+        self.assertIsNone(choose_encoding('gzip;q=0, br;q=0, *'))
+        self.assertIsNone(choose_encoding('gzip;q=x'))
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+
+@override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 100})
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        stats.clear()
+
+    def test_brotli(self):
+        response = run(HttpResponse(BODY, content_type='application/json'))
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+        self.assertEqual(
+            response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_gzip(self):
+        response = run(
+            HttpResponse(BODY, content_type='application/json'),
+            accept='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_small_body_skipped(self):
+        response = run(HttpResponse(b'{}', content_type='application/json'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{}')
+
+    def test_compressed_media_skipped(self):
+        for content_type in ('image/webp', 'application/gzip'):
+            response = run(HttpResponse(BODY, content_type=content_type))
+
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_not_accepted(self):
+        response = run(HttpResponse(BODY), accept='identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_etag_weakened(self):
+        original = HttpResponse(BODY)
+        original['ETag'] = '"abc"'
+
+        response = run(original)
+
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_etag_kept_when_not_compressed(self):
+        original = HttpResponse(BODY)
+        original['ETag'] = '"abc"'
+
+        response = run(original, accept='identity')
+
+        self.assertEqual(response['ETag'], '"abc"')
+
+    def test_streaming(self):
+        chunks = [BODY[:500], BODY[500:]]
+
+        response = run(StreamingHttpResponse(chunks), accept='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), BODY)
+
+    def test_stats(self):
+        run(HttpResponse(BODY), accept='gzip')
+        response = run(StreamingHttpResponse([BODY]), accept='gzip')
+        b''.join(response.streaming_content)
+
+        entry = stats.snapshot()['gzip']
+        self.assertEqual(entry['responses'], 2)
+        self.assertEqual(entry['bytes_in'], 2 * len(BODY))
+        self.assertGreater(entry['bytes_saved'], 0)
+        self.assertGreater(entry['seconds'], 0)
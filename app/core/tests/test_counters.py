@@ -0,0 +1,146 @@
+""" Tests for denormalized recipe counts """
+import threading
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from core.counters import reconcile_recipe_counts
+from core.models import Ingredient, Recipe, Tag
+
+
+class RecipeCountTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'test@123')
+        self.tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        self.tag2 = Tag.objects.create(user=self.user, name='Quick')
+        self.recipe = self.create_recipe()
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            user=self.user, title='Recipe', time_minutes=5,
+            price=Decimal('1.00'))
+
+    def assertCounts(self, tag1, tag2):
+        self.tag1.refresh_from_db()
+        self.tag2.refresh_from_db()
+        self.assertEqual(
+            (self.tag1.recipe_count, self.tag2.recipe_count), (tag1, tag2))
+
+    def test_add_remove_clear(self):
+        other = self.create_recipe()
+        self.recipe.tags.add(self.tag1, self.tag2)
+        other.tags.add(self.tag1)
+        self.recipe.tags.add(self.tag1)
+        self.assertCounts(2, 1)
+
+        self.recipe.tags.remove(self.tag2)
+        other.tags.remove(self.tag2)
+        self.assertCounts(2, 0)
+
+        self.recipe.tags.clear()
+        self.assertCounts(1, 0)
+
+    def test_set(self):
+        self.recipe.tags.set([self.tag1])
+        self.recipe.tags.set([self.tag2])
+        self.assertCounts(0, 1)
+
+    def test_reverse_add_remove_clear(self):
+        other = self.create_recipe()
+        self.tag1.recipe_set.add(self.recipe, other)
+        self.assertCounts(2, 0)
+
+        self.tag1.recipe_set.remove(other)
+        self.assertCounts(1, 0)
+
+        self.tag1.recipe_set.clear()
+        self.assertCounts(0, 0)
+
+    def test_recipe_delete(self):
+        self.recipe.tags.add(self.tag1)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe.ingredients.add(ingredient)
+
+        self.recipe.delete()
+
+        self.assertCounts(0, 0)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.recipe_count, 0)
+
+    def test_remove_does_not_go_negative(self):
+        self.recipe.tags.add(self.tag1)
+        Tag.objects.filter(pk=self.tag1.pk).update(recipe_count=0)
+
+        self.recipe.tags.remove(self.tag1)
+
+        self.assertCounts(0, 0)
+
+    def test_reconcile(self):
+        self.recipe.tags.add(self.tag1)
+        Tag.objects.filter(pk=self.tag1.pk).update(recipe_count=5)
+        Tag.objects.filter(pk=self.tag2.pk).update(recipe_count=1)
+
+        self.assertEqual(reconcile_recipe_counts(Tag, fix=False), 2)
+        self.assertCounts(5, 1)
+        self.assertEqual(reconcile_recipe_counts(Tag), 2)
+        self.assertCounts(1, 0)
+        self.assertEqual(reconcile_recipe_counts(Tag), 0)
+
+    def test_reconcile_command(self):
+        Tag.objects.filter(pk=self.tag1.pk).update(recipe_count=3)
+        out = StringIO()
+
+        call_command('reconcile_recipe_counts', stdout=out)
+
+        self.assertCounts(0, 0)
+        self.assertIn('Fixed 1 tag', out.getvalue())
+
+
+class ConcurrentRemoveTests(TransactionTestCase):
+
+    def test_concurrent_removes_of_a_link(self):
+        """Test only the removal that deletes the link decrements."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'test@123')
+        tag = Tag.objects.create(user=user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=user, title='Recipe', time_minutes=5, price=Decimal('1.00'))
+        other = Recipe.objects.create(
+            user=user, title='Other', time_minutes=5, price=Decimal('1.00'))
+        recipe.tags.add(tag)
+        other.tags.add(tag)
+        removed, release = threading.Event(), threading.Event()
+
+        def remove_and_wait():
+            try:
+                with transaction.atomic():
+                    Recipe.objects.get(pk=recipe.pk).tags.remove(tag)
+                    removed.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        def remove():
+            try:
+                Recipe.objects.get(pk=recipe.pk).tags.remove(tag)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=remove_and_wait)
+        first.start()
+        removed.wait(5)
+        second = threading.Thread(target=remove)
+        second.start()
+        second.join(0.5)
+        release.set()
+        first.join()
+        second.join()
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
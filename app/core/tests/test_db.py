@@ -0,0 +1,138 @@
+""" Tests for the database backend and connection pool """
+from types import SimpleNamespace
+
+from psycopg2 import extensions
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.db.backends.postgresql import base
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(
+            transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def rollback(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool('test', max_size=2, timeout=0.05)
+
+    def test_reuses_returned_connections(self):
+        first, reused = self.pool.getconn(FakeConnection)
+        self.assertFalse(reused)
+        self.pool.putconn(first)
+
+        second, reused = self.pool.getconn(FakeConnection)
+
+        self.assertIs(second, first)
+        self.assertTrue(reused)
+        self.assertEqual(self.pool.stats()['created'], 1)
+
+    def test_timeout_when_exhausted(self):
+        self.pool.getconn(FakeConnection)
+        self.pool.getconn(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.getconn(FakeConnection)
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+    def test_rolls_back_and_discards_closed(self):
+        open_conn, _ = self.pool.getconn(FakeConnection)
+        open_conn.info.transaction_status = \
+            extensions.TRANSACTION_STATUS_INTRANS
+        closed_conn, _ = self.pool.getconn(FakeConnection)
+        closed_conn.close()
+
+        self.pool.putconn(open_conn)
+        self.pool.putconn(closed_conn)
+
+        stats = self.pool.stats()
+        self.assertEqual((stats['size'], stats['idle']), (1, 1))
+        self.assertEqual(stats['discarded'], 1)
+        self.assertIs(self.pool.getconn(FakeConnection)[0], open_conn)
+
+    def test_closeall(self):
+        checked_out, _ = self.pool.getconn(FakeConnection)
+        idle, _ = self.pool.getconn(FakeConnection)
+        self.pool.putconn(idle)
+
+        self.pool.closeall()
+
+        self.assertTrue(idle.closed)
+        self.assertFalse(checked_out.closed)
+        self.pool.putconn(checked_out)
+        self.assertTrue(checked_out.closed)
+        self.assertEqual(self.pool.stats()['size'], 0)
+        self.assertIsNot(self.pool.getconn(FakeConnection)[0], checked_out)
+
+    def test_failed_connect_frees_room(self):
+        def connect():
+            raise OSError
+
+        with self.assertRaises(OSError):
+            self.pool.getconn(connect)
+        self.assertEqual(self.pool.stats()['size'], 0)
+
+
+class DatabaseWrapperTests(TransactionTestCase):
+
+    def make_wrapper(self, **settings):
+        options = {**connection.settings_dict['OPTIONS'],
+                   'application_name': 'pooltest'}
+        wrapper = base.DatabaseWrapper(
+            {**connection.settings_dict, 'OPTIONS': options, **settings})
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def remove_pools(self):
+        with base._pools_lock:
+            for key in [key for key in base._pools
+                        if ('application_name', 'pooltest') in key[1]]:
+                base._pools.pop(key).closeall()
+
+    def backend_pid(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_health_check_replaces_dead_connection(self):
+        wrapper = self.make_wrapper(
+            CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True, POOL={})
+        pid = self.backend_pid(wrapper)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        # As at the end of a request.
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
+
+    def test_pool_needs_conn_max_age_0(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.make_wrapper(CONN_MAX_AGE=60, POOL={'MAX_SIZE': 1})
+
+    def test_pool_reuses_connections(self):
+        self.addCleanup(self.remove_pools)
+        pool_settings = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True,
+                         'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 1}}
+        first = self.make_wrapper(**pool_settings)
+        pid = self.backend_pid(first)
+        first.close()
+
+        second = self.make_wrapper(**pool_settings)
+
+        self.assertEqual(self.backend_pid(second), pid)
+        self.assertEqual(second._pool_in_use.stats()['checkouts'], 2)
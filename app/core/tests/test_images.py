@@ -0,0 +1,86 @@
+""" Tests for recipe image renditions """
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from PIL import Image
+
+from core import images
+from core.models import Recipe
+
+RENDITIONS = {'thumb': (20, 20), 'large': (60, 60)}
+
+
+def save_image(name, size=(100, 50)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='JPEG')
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+@override_settings(
+    RECIPE_IMAGE_RENDITIONS=RENDITIONS,
+    RECIPE_IMAGE_FORMATS=['webp', 'jpeg'],
+)
+class RenditionTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.image_name = save_image('uploads/recipe/example.jpg')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_rendition_name(self):
+        name = images.rendition_name('uploads/recipe/a.png', 'thumb', 'webp')
+
+        self.assertEqual(name, 'uploads/recipe/a_thumb.webp')
+
+    def test_generate_renditions(self):
+        created = images.generate_renditions(self.image_name)
+
+        self.assertEqual(len(created), 4)
+        with default_storage.open(
+                'uploads/recipe/example_thumb.webp') as f:
+            image = Image.open(f)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (20, 10))
+        with default_storage.open(
+                'uploads/recipe/example_large.jpg') as f:
+            image = Image.open(f)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (60, 30))
+
+    def test_generate_renditions_idempotent(self):
+        images.generate_renditions(self.image_name)
+
+        self.assertEqual(images.generate_renditions(self.image_name), [])
+        self.assertEqual(
+            len(images.generate_renditions(self.image_name, force=True)), 4)
+
+    def test_rendition_urls(self):
+        urls = images.rendition_urls(self.image_name)
+
+        self.assertEqual(set(urls), {'thumb', 'large'})
+        self.assertTrue(urls['thumb']['webp'].endswith('example_thumb.webp'))
+
+    def test_generate_renditions_command(self):
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'test@123')
+        Recipe.objects.create(
+            user=user, title='Recipe', time_minutes=5, price='1.00',
+            image=self.image_name)
+        Recipe.objects.create(
+            user=user, title='No image', time_minutes=5, price='1.00')
+
+        call_command('generate_renditions', stdout=StringIO())
+
+        for _, _, name in images.rendition_names(self.image_name):
+            self.assertTrue(default_storage.exists(name))
@@ -0,0 +1,178 @@
+""" Tests for the image job queue """
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import ImageJob, Recipe
+
+CRASH_MARKER = os.path.join(tempfile.gettempdir(), f'crash-{os.getpid()}')
+
+
+def crash_once(image_name):
+    """Kill the pool process running the first job it is given."""
+    if not os.path.exists(CRASH_MARKER):
+        open(CRASH_MARKER, 'w').close()
+        os._exit(1)
+    return 0.1
+
+
+def crash_on_b(image_name):
+    """Kill the pool process running b.jpg, every time."""
+    if image_name.endswith('b.jpg'):
+        os._exit(1)
+    return 0.1
+
+
+@override_settings(IMAGE_JOB_MAX_ATTEMPTS=2, IMAGE_JOB_RETRY_DELAY=10)
+class ImageJobTests(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'test@123')
+        self.recipe = Recipe.objects.create(
+            user=user, title='Recipe', time_minutes=5,
+            price=Decimal('1.00'), image='uploads/recipe/a.jpg')
+
+    def test_enqueue_sets_pending(self):
+        job = jobs.enqueue_image_job(self.recipe)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'pending')
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertEqual(job.image, 'uploads/recipe/a.jpg')
+
+    def test_claim_jobs(self):
+        job = jobs.enqueue_image_job(self.recipe)
+        ImageJob.objects.create(
+            recipe=self.recipe, image='later.jpg',
+            run_after=timezone.now() + timezone.timedelta(hours=1))
+
+        claimed = jobs.claim_jobs(10)
+
+        self.assertEqual([j.pk for j in claimed], [job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(jobs.claim_jobs(10), [])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'processing')
+
+    def test_claim_stale_running_job(self):
+        job = jobs.enqueue_image_job(self.recipe)
+        jobs.claim_jobs(10)
+
+        self.assertEqual(jobs.claim_jobs(10, stale_after=60), [])
+        ImageJob.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timezone.timedelta(minutes=5))
+        self.assertEqual(
+            [j.pk for j in jobs.claim_jobs(10, stale_after=60)], [job.pk])
+
+    def test_fail_job_retries_then_fails(self):
+        jobs.enqueue_image_job(self.recipe)
+        job = jobs.claim_jobs(1)[0]
+
+        jobs.fail_job(job, 'boom')
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+
+        ImageJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job = jobs.claim_jobs(1)[0]
+        jobs.fail_job(job, 'boom')
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.last_error, 'boom')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'failed')
+
+    @patch('core.jobs.generate_renditions')
+    def test_command_processes_jobs(self, mock_generate):
+        job = jobs.enqueue_image_job(self.recipe)
+        out = StringIO()
+
+        call_command('process_image_jobs', once=True, workers=0, stdout=out)
+
+        mock_generate.assert_called_once_with('uploads/recipe/a.jpg')
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertIsNotNone(job.duration)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'ready')
+        self.assertIn('Processed 1 jobs, 0 failed', out.getvalue())
+
+    @patch('core.jobs.generate_renditions', side_effect=OSError('bad'))
+    def test_command_records_failures(self, mock_generate):
+        job = jobs.enqueue_image_job(self.recipe)
+
+        call_command('process_image_jobs', once=True, workers=0,
+                     stdout=StringIO(), stderr=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertEqual(job.last_error, 'bad')
+
+    def test_status_not_overwritten_for_new_image(self):
+        jobs.enqueue_image_job(self.recipe)
+        job = jobs.claim_jobs(1)[0]
+        self.recipe.image = 'uploads/recipe/b.jpg'
+        self.recipe.image_status = 'pending'
+        self.recipe.save()
+
+        jobs.complete_job(job, 0.1)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'pending')
+
+
+class WorkerCrashTests(TransactionTestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'test@123')
+        self.recipe = Recipe.objects.create(
+            user=user, title='Recipe', time_minutes=5,
+            price=Decimal('1.00'), image='uploads/recipe/a.jpg')
+        self.addCleanup(lambda: os.path.exists(CRASH_MARKER)
+                        and os.remove(CRASH_MARKER))
+
+    @patch('core.management.commands.process_image_jobs.process_image',
+           crash_once)
+    def test_command_replaces_broken_pool(self):
+        job = jobs.enqueue_image_job(self.recipe)
+        err = StringIO()
+
+        call_command('process_image_jobs', once=True, workers=1,
+                     stdout=StringIO(), stderr=err)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('worker process died', err.getvalue())
+
+    @override_settings(IMAGE_JOB_MAX_ATTEMPTS=2, IMAGE_JOB_RETRY_DELAY=0)
+    @patch('core.management.commands.process_image_jobs.process_image',
+           crash_on_b)
+    def test_job_killing_its_worker_fails(self):
+        crasher = jobs.enqueue_image_job(Recipe.objects.create(
+            user=self.recipe.user, title='Other', time_minutes=5,
+            price=Decimal('1.00'), image='uploads/recipe/b.jpg'))
+        innocent = jobs.enqueue_image_job(self.recipe)
+
+        call_command('process_image_jobs', once=True, workers=1,
+                     stdout=StringIO(), stderr=StringIO())
+
+        crasher.refresh_from_db()
+        self.assertEqual(crasher.status, ImageJob.FAILED)
+        self.assertEqual(crasher.attempts, 2)
+        self.assertEqual(crasher.last_error, 'Worker process died')
+        innocent.refresh_from_db()
+        self.assertEqual(innocent.status, ImageJob.DONE)
+        self.assertEqual(innocent.attempts, 1)
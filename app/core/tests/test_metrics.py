@@ -0,0 +1,106 @@
+""" Tests for Prometheus metrics """
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Recipe
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'metrics@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}')
+
+    def test_request_latency_and_queries_per_view(self):
+        labels = {'view': 'RecipeViewSet.list', 'method': 'GET',
+                  'status': '200'}
+        before = sample('api_request_duration_seconds_count', **labels)
+        queries_before = sample('api_request_db_queries_sum',
+                                view='RecipeViewSet.list')
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            sample('api_request_duration_seconds_count', **labels),
+            before + 1)
+        self.assertGreater(
+            sample('api_request_db_queries_sum', view='RecipeViewSet.list'),
+            queries_before)
+
+    @override_settings(API_RESPONSE_CACHE=True)
+    def test_cache_lookups(self):
+        hits = sample('cache_lookups_total', cache='recipe_response',
+                      result='hit')
+        misses = sample('cache_lookups_total', cache='recipe_response',
+                        result='miss')
+
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(
+            sample('cache_lookups_total', cache='recipe_response',
+                   result='miss'), misses + 1)
+        self.assertEqual(
+            sample('cache_lookups_total', cache='recipe_response',
+                   result='hit'), hits + 1)
+
+    def test_image_job_duration(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Recipe', time_minutes=5,
+            price=Decimal('1.00'), image='uploads/recipe/a.jpg')
+        jobs.enqueue_image_job(recipe)
+        before = sample('image_job_duration_seconds_count')
+        done = sample('image_jobs_total', status='done')
+
+        jobs.complete_job(jobs.claim_jobs(1)[0], 0.3)
+
+        self.assertEqual(sample('image_job_duration_seconds_count'),
+                         before + 1)
+        self.assertEqual(sample('image_jobs_total', status='done'), done + 1)
+
+    def test_metrics_view(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'api_request_duration_seconds_bucket', res.content)
+        self.assertIn(b'view="RecipeViewSet.list"', res.content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_view_token(self):
+        client = Client()
+        res = client.get(METRICS_URL)
+        self.assertEqual(res.status_code, 403)
+
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, 200)
+
+    def test_metrics_view_multiprocess(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with patch.dict('os.environ',
+                            {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
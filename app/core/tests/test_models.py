@@ -1,6 +1,7 @@
 """ Tests for models """
 
 from decimal import Decimal
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -78,6 +79,20 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_names_unique_per_user(self):
+        user = create_user()
+        other = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=other, name='Vegan')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name='Vegan')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Ingredient.objects.bulk_create([
+                models.Ingredient(user=user, name='Salt'),
+                models.Ingredient(user=user, name='Salt'),
+            ])
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         uuid = 'uuid-test'
@@ -0,0 +1,88 @@
+""" Tests for query budgets """
+from unittest.mock import MagicMock
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from core.querybudget import (
+    QueryBudgetExceeded,
+    QueryBudgetMiddleware,
+    QueryCounter,
+    get_view_budget,
+    query_budget,
+)
+
+
+def run_queries(n):
+    for _ in range(n):
+        list(get_user_model().objects.all())
+
+
+class QueryBudgetTests(TestCase):
+
+    def test_counter_counts_queries(self):
+        with QueryCounter() as counter:
+            run_queries(3)
+
+        self.assertEqual(counter.count, 3)
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_decorator_within_budget(self):
+        func = query_budget(2)(run_queries)
+
+        func(2)
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_decorator_over_budget_raises(self):
+        func = query_budget(2)(run_queries)
+
+        with self.assertRaises(QueryBudgetExceeded):
+            func(3)
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_decorator_over_budget_logs(self):
+        func = query_budget(1)(run_queries)
+
+        with self.assertLogs('core.querybudget', level='WARNING'):
+            func(2)
+
+    def test_view_budget_per_action(self):
+        view_func = MagicMock()
+        view_func.cls.query_budget = {'list': 3}
+        view_func.actions = {'get': 'list', 'post': 'create'}
+
+        self.assertEqual(get_view_budget(view_func, 'GET'), 3)
+        self.assertIsNone(get_view_budget(view_func, 'POST'))
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_middleware_enforces_view_budget(self):
+        request = MagicMock()
+        view_func = MagicMock()
+        view_func.cls.query_budget = 1
+
+        def get_response(request):
+            middleware.process_view(request, view_func, (), {})
+            run_queries(2)
+
+        middleware = QueryBudgetMiddleware(get_response)
+
+        with self.assertRaises(QueryBudgetExceeded):
+            middleware(request)
+
+    @override_settings(QUERY_COUNT_HEADER=True)
+    def test_middleware_reports_query_count(self):
+        def get_response(request):
+            run_queries(2)
+            return HttpResponse()
+
+        response = QueryBudgetMiddleware(get_response)(MagicMock())
+
+        self.assertEqual(response['X-Query-Count'], '2')
+
+    @override_settings(QUERY_COUNT_HEADER=False)
+    def test_middleware_query_count_header_off(self):
+        response = QueryBudgetMiddleware(lambda request: HttpResponse())(
+            MagicMock())
+
+        self.assertFalse(response.has_header('X-Query-Count'))
@@ -0,0 +1,92 @@
+""" Tests for the orjson renderer and parser """
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+PAYLOAD = {
+    'id': 1,
+    'title': 'Crème brûlée\u2028line',
+    'price': Decimal('5.50'),
+    'created': datetime.datetime(
+        2021, 5, 4, 3, 2, 1, 123456, tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2021, 5, 4),
+    'time': datetime.time(3, 2, 1),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Recipe'),
+    'tags': [{'id': 2, 'name': 'Vegan'}],
+    'counts': {1: 2},
+    'empty': None,
+}
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_matches_drf_renderer(self):
+        self.assertEqual(
+            ORJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_indent_uses_stdlib(self):
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            ORJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type),
+        )
+
+    @patch('core.renderers.orjson', None)
+    def test_fallback_without_orjson(self):
+        self.assertEqual(
+            ORJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+
+class ORJSONParserTests(SimpleTestCase):
+    body = '{"title": "Crème", "price": 5.5, "tags": [{"name": "a"}]}'
+
+    def test_matches_drf_parser(self):
+        self.assertEqual(
+            ORJSONParser().parse(BytesIO(self.body.encode())),
+            JSONParser().parse(BytesIO(self.body.encode())),
+        )
+
+    def test_invalid_json(self):
+        for body in (b'{"title": ', b'{"price": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(BytesIO(body))
+
+    def test_other_encoding_uses_stdlib(self):
+        body = self.body.encode('latin-1')
+
+        data = ORJSONParser().parse(
+            BytesIO(body), parser_context={'encoding': 'latin-1'})
+
+        self.assertEqual(data['title'], 'Crème')
+
+
+class BenchmarkJSONTests(SimpleTestCase):
+
+    def test_benchmark_command(self):
+        out = StringIO()
+
+        call_command('benchmark_json', sizes=[2], runs=1, stdout=out)
+
+        self.assertIn('2 recipes, raw Decimal/datetime', out.getvalue())
+        self.assertIn('orjson is', out.getvalue())
@@ -0,0 +1,147 @@
+""" Tests for the slow query log """
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, SlowQuery
+from core.slowqueries import (
+    SlowQueryRecorder,
+    describe_params,
+    explain,
+    plan_nodes,
+    record_slow_queries,
+)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class SlowQueryTests(TestCase):
+
+    def test_recorder_keeps_slow_queries(self):
+        recorder = SlowQueryRecorder(threshold=0.05, limit=1)
+
+        with connection.execute_wrapper(recorder), \
+                connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.execute('SELECT pg_sleep(0.06)')
+            cursor.execute('SELECT pg_sleep(0.06), 2')
+
+        self.assertEqual(len(recorder.queries), 1)
+        sql, params, many, seconds = recorder.queries[0]
+        self.assertEqual(sql, 'SELECT pg_sleep(0.06)')
+        self.assertFalse(many)
+        self.assertGreaterEqual(seconds, 0.05)
+
+    def test_explain(self):
+        sql, params = Recipe.objects.filter(
+            title='Soup').query.sql_with_params()
+
+        plan = explain(sql, params)
+
+        self.assertIn(
+            'Seq Scan on core_recipe', list(plan_nodes(plan['Plan'])))
+        self.assertIsNone(explain('SET TIME ZONE UTC', None))
+
+    @override_settings(SLOW_QUERY_LOG={'MAX_ROWS': 3})
+    def test_ring_buffer(self):
+        with self.assertLogs('core.slowqueries', 'WARNING') as logs:
+            record_slow_queries(
+                [(f'SELECT {n}', None, False, 1.0) for n in range(5)])
+
+        self.assertEqual(len(logs.records), 5)
+        self.assertEqual(
+            list(SlowQuery.objects.order_by('id').values_list(
+                'sql', flat=True)),
+            ['SELECT 2', 'SELECT 3', 'SELECT 4'],
+        )
+
+    @override_settings(SLOW_QUERY_LOG={'THRESHOLD_MS': 0,
+                                       'MAX_PER_REQUEST': 100})
+    def test_middleware_records_view_and_plan(self):
+        user = get_user_model().objects.create_user(
+            'slow@example.com', 'testpass123')
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            client.get(RECIPES_URL)
+
+        recipe_query = SlowQuery.objects.filter(
+            sql__startswith='SELECT', sql__contains='FROM "core_recipe"',
+        ).get(sql__contains='ORDER BY')
+        self.assertEqual(recipe_query.view, 'RecipeViewSet.list')
+        self.assertEqual(recipe_query.path, RECIPES_URL)
+        self.assertIn("'int'", recipe_query.params)
+        self.assertIsNotNone(recipe_query.plan)
+        token_query = SlowQuery.objects.get(
+            sql__contains='FROM "authtoken_token"')
+        self.assertEqual(token_query.params, '(redacted)')
+        self.assertIsNone(token_query.plan)
+
+    def test_describe_params(self):
+        self.assertEqual(describe_params(('secret', 3, [1, 2], None)),
+                         "('str[6]', 'int', 'list[2]', 'NoneType')")
+        self.assertEqual(describe_params({'key': 'secret'}),
+                         "{'key': 'str[6]'}")
+
+    def test_params_and_plan_values_not_kept(self):
+        sql, params = Recipe.objects.filter(
+            title='Secret soup').query.sql_with_params()
+
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            record_slow_queries([(sql, params, False, 1.0)])
+
+        slow_query = SlowQuery.objects.get()
+        self.assertEqual(slow_query.params, "('str[11]',)")
+        self.assertEqual(list(plan_nodes(slow_query.plan['Plan'])),
+                         ['Seq Scan on core_recipe'])
+        self.assertNotIn('Secret soup', json.dumps(slow_query.plan))
+
+    @override_settings(SLOW_QUERY_LOG={'CAPTURE_PARAMS': True})
+    def test_capture_params(self):
+        sql, params = Recipe.objects.filter(
+            title='Secret soup').query.sql_with_params()
+
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            record_slow_queries([
+                (sql, params, False, 1.0),
+                ('SELECT * FROM "core_user" WHERE "email" = %s',
+                 ('a@example.com',), False, 1.0),
+            ])
+
+        recipe_query, user_query = SlowQuery.objects.order_by('id')
+        self.assertEqual(recipe_query.params, "('Secret soup',)")
+        self.assertIn('Secret soup', json.dumps(recipe_query.plan))
+        self.assertEqual(user_query.params, '(redacted)')
+        self.assertIsNone(user_query.plan)
+
+    @override_settings(SLOW_QUERY_LOG={'ENABLED': False, 'THRESHOLD_MS': 0})
+    def test_middleware_disabled(self):
+        Client().get(RECIPES_URL)
+
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_admin(self):
+        admin_user = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass123')
+        sql, params = Recipe.objects.all().query.sql_with_params()
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            record_slow_queries(
+                [(sql, params, False, 0.5)], 'RecipeViewSet.list')
+        slow_query = SlowQuery.objects.get()
+        client = Client()
+        client.force_login(admin_user)
+
+        res = client.get(reverse('admin:core_slowquery_changelist'))
+        self.assertContains(res, 'Seq Scan on core_recipe')
+        self.assertContains(res, 'RecipeViewSet.list')
+
+        res = client.get(
+            reverse('admin:core_slowquery_change', args=[slow_query.pk]))
+        self.assertContains(res, '&quot;Node Type&quot;')
@@ -0,0 +1,100 @@
+""" Tests for per-request timings """
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.timing import Timings, _current, phase
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+class TimingsTests(SimpleTestCase):
+
+    def test_header(self):
+        timings = Timings()
+        timings.add('auth', 0.0012)
+        timings.add('db', 0.002)
+        timings.queries = 3
+
+        self.assertEqual(
+            timings.header(),
+            'auth;dur=1.20, db;dur=2.00;desc="3 queries"',
+        )
+
+    def test_phase_outside_sampled_request_does_nothing(self):
+        with phase('serialize'):
+            pass
+
+        self.assertIsNone(_current.get())
+
+    def test_nested_phase_counted_once(self):
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            with phase('serialize'):
+                with phase('serialize'):
+                    pass
+        finally:
+            _current.reset(token)
+
+        self.assertEqual(list(timings.seconds), ['serialize'])
+        self.assertGreater(timings.seconds['serialize'], 0)
+
+
+class ServerTimingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'timing@example.com', 'testpass123')
+        Recipe.objects.create(
+            user=user, title='Soup', time_minutes=10, price='5.00')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+
+    @override_settings(SERVER_TIMING={'SAMPLE_RATE': 1, 'HEADER': True})
+    def test_phases_in_header(self):
+        res = self.client.get(RECIPES_URL)
+
+        metrics = parse_server_timing(res['Server-Timing'])
+        for name in ('auth', 'queryset', 'serialize', 'render', 'db',
+                     'total'):
+            self.assertIn(name, metrics)
+            self.assertGreaterEqual(float(metrics[name]['dur']), 0)
+        self.assertRegex(metrics['db']['desc'], r'"\d+ queries"')
+
+    @override_settings(SERVER_TIMING={'SAMPLE_RATE': 1, 'LOG': True})
+    def test_logs_timings(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'RecipeViewSet.list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('total', record['ms'])
+
+    @override_settings(SERVER_TIMING={'SAMPLE_RATE': 0})
+    def test_unsampled_request(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING={'SAMPLE_RATE': 1, 'HEADER': False})
+    def test_header_off(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
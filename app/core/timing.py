@@ -0,0 +1,209 @@
+"""
+Per-request timing of the phases of API views.
+
+``ServerTimingMiddleware`` samples requests. For a sampled request it
+times the whole request and every SQL query, and the DRF hooks below
+time token authentication (``auth``), fetching the objects of a page or
+detail (``queryset``), ``to_representation`` (``serialize``) and the
+renderer (``render``). The durations are sent in a ``Server-Timing``
+header and logged as one JSON line on the ``core.timing`` logger.
+
+Phases overlap: queries run while serializing count towards both
+``serialize`` and ``db``. Requests that are not sampled only pay for a
+context variable lookup per hook.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SAMPLE_RATE': 1.0,
+    'HEADER': True,
+    'LOG': True,
+}
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def _settings():
+    return {**DEFAULTS, **getattr(settings, 'SERVER_TIMING', {})}
+
+
+def view_name(view_func, method):
+    """Name a resolved view as ``ViewClass.action`` where it has one."""
+    view_class = getattr(view_func, 'cls', None) or \
+        getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class Timings:
+    """Durations of the phases of one request.
+
+    Also an execute wrapper timing and counting SQL queries.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.queries = 0
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - start)
+            self.queries += 1
+
+    def header(self):
+        """Format the durations as a Server-Timing header value."""
+        metrics = []
+        for name, seconds in self.seconds.items():
+            metric = f'{name};dur={seconds * 1000:.2f}'
+            if name == 'db':
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+    def milliseconds(self):
+        return {
+            name: round(seconds * 1000, 3)
+            for name, seconds in self.seconds.items()
+        }
+
+
+class _Phase:
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.timings.active.add(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        self.timings.active.discard(self.name)
+
+
+class _NoPhase:
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name):
+    """Context manager adding its duration to phase `name`.
+
+    Does nothing when the request is not sampled, or when `name` is
+    already being timed: nested serializers are counted once.
+    """
+    timings = _current.get()
+    if timings is None or name in timings.active:
+        return _NO_PHASE
+    return _Phase(timings, name)
+
+
+class ServerTimingMiddleware:
+    """Time sampled requests, see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = _settings()
+        if random.random() >= options['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        timings = Timings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        timings.add('total', time.perf_counter() - start)
+
+        if options['HEADER']:
+            response['Server-Timing'] = timings.header()
+        if options['LOG']:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': getattr(request, '_timing_view', None),
+                'status': response.status_code,
+                'queries': timings.queries,
+                'ms': timings.milliseconds(),
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view = view_name(view_func, request.method)
+
+
+class _TimedRenderer:
+    """Proxy of a renderer timing its `render` calls."""
+
+    def __init__(self, renderer):
+        self._renderer = renderer
+
+    def __getattr__(self, name):
+        return getattr(self._renderer, name)
+
+    def render(self, *args, **kwargs):
+        with phase('render'):
+            return self._renderer.render(*args, **kwargs)
+
+
+class ServerTimingMixin:
+    """Time the auth, queryset and render phases of a DRF view."""
+
+    def perform_authentication(self, request):
+        with phase('auth'):
+            super().perform_authentication(request)
+
+    def get_object(self):
+        with phase('queryset'):
+            return super().get_object()
+
+    def paginate_queryset(self, queryset):
+        with phase('queryset'):
+            return super().paginate_queryset(queryset)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if renderer is not None and _current.get() is not None:
+            response.accepted_renderer = _TimedRenderer(renderer)
+        return response
+
+
+class TimedSerializerMixin:
+    """Time `to_representation` as the serialize phase."""
+
+    def to_representation(self, instance):
+        with phase('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,118 @@
+"""
+Bulk import of recipes
+"""
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+
+from core.counters import adjust_recipe_counts
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.cache import bump_data_version
+from recipe.serializers import (
+    RecipeDetailsSerializer,
+    bulk_get_or_create,
+)
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_recipes(user, rows, context, chunk_size=500):
+    """Validate and create recipes from `rows`, one chunk at a time.
+
+    `rows` yields ``(line_number, data, error)`` tuples as produced by
+    `NDJSONParser`. Yields one result dict per row, in input order.
+    """
+    for chunk in chunked(rows, chunk_size):
+        yield from _import_chunk(user, chunk, context)
+
+
+def _import_chunk(user, chunk, context):
+    results = {}
+    valid = []
+    for line_number, data, error in chunk:
+        if error:
+            results[line_number] = {'line': line_number, 'errors': error}
+            continue
+        serializer = RecipeDetailsSerializer(data=data, context=context)
+        if serializer.is_valid():
+            valid.append((line_number, serializer.validated_data))
+        else:
+            results[line_number] = {
+                'line': line_number,
+                'errors': serializer.errors,
+            }
+
+    if valid:
+        with transaction.atomic():
+            recipes = _create_recipes(user, [data for _, data in valid])
+            # bulk_create does not send the signals that invalidate caches.
+            bump_data_version(user.pk)
+        for (line_number, _), recipe in zip(valid, recipes):
+            results[line_number] = {'line': line_number, 'id': recipe.id}
+
+    for line_number, _, _ in chunk:
+        yield results[line_number]
+
+
+def _create_recipes(user, rows):
+    """Create recipes with their tags and ingredients in bulk."""
+    recipes = []
+    tag_names = []
+    ingredient_names = []
+    for data in rows:
+        data = dict(data)
+        tags = [tag['name'] for tag in data.pop('tags', [])]
+        ingredients = [
+            ingredient['name'] for ingredient in data.pop('ingredients', [])
+        ]
+        recipes.append((Recipe(user=user, **data), tags, ingredients))
+        tag_names += tags
+        ingredient_names += ingredients
+
+    Recipe.objects.bulk_create([recipe for recipe, _, _ in recipes])
+    tags_by_name = {
+        tag.name: tag
+        for tag in bulk_get_or_create(Tag, user, tag_names)
+    }
+    ingredients_by_name = {
+        ingredient.name: ingredient
+        for ingredient in bulk_get_or_create(
+            Ingredient, user, ingredient_names)
+    }
+
+    tag_links = set()
+    ingredient_links = set()
+    for recipe, tags, ingredients in recipes:
+        tag_links.update(
+            (recipe.id, tags_by_name[name].id) for name in tags)
+        ingredient_links.update(
+            (recipe.id, ingredients_by_name[name].id) for name in ingredients)
+
+    TagLink = Recipe.tags.through
+    IngredientLink = Recipe.ingredients.through
+    TagLink.objects.bulk_create([
+        TagLink(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id, tag_id in tag_links
+    ])
+    IngredientLink.objects.bulk_create([
+        IngredientLink(recipe_id=recipe_id, ingredient_id=ingredient_id)
+        for recipe_id, ingredient_id in ingredient_links
+    ])
+    # Bulk created links send no m2m_changed, count them here.
+    adjust_recipe_counts(Tag, Counter(tag_id for _, tag_id in tag_links))
+    adjust_recipe_counts(Ingredient, Counter(
+        ingredient_id for _, ingredient_id in ingredient_links))
+    return [recipe for recipe, _, _ in recipes]
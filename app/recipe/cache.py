@@ -0,0 +1,134 @@
+"""
+Per-user versioned cache for recipe API list responses.
+
+Every user has a data version counter. Cached responses are keyed by the
+version, so bumping it (from model signals, see recipe.signals)
+invalidates all of that user's cached responses in O(1) without scanning
+keys. Stale entries simply expire.
+
+Invalidation goes through the cache, so responses are only cached when
+``API_RESPONSE_CACHE`` is on, which by default needs a cache shared by
+all processes (see settings).
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from core.metrics import count_cache_lookup
+
+VERSION_KEY = 'recipe:version:{user_id}'
+RESPONSE_KEY = 'recipe:response:{user_id}:{version}:{digest}'
+
+# Hit/miss counts of this process, kept out of the cache so lookups
+# don't write to it.
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _initial_version():
+    # Time based so a version evicted from the cache does not restart at
+    # a value whose responses may still be cached.
+    return int(time.time() * 1000)
+
+
+def get_data_version(user_id):
+    """Return the current data version for a user."""
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _incr_version(user_id):
+    key = VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def bump_data_version(user_id):
+    """Invalidate everything cached for a user.
+
+    Inside a transaction the version is bumped again on commit, so a
+    response computed from pre-commit data by a concurrent request is
+    not served after the commit.
+    """
+    _incr_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incr_version(user_id))
+
+
+def _count_lookup(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+    count_cache_lookup('recipe_response', hit)
+
+
+def cache_stats():
+    """Return this process's hit/miss counters for cached list
+    responses."""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def response_cache_key(request):
+    """Return the cache key for `request` under the user's data version.
+
+    Pagination links are absolute, so the host is part of the key.
+    """
+    digest = hashlib.md5(
+        f'{request.get_host()}{request.get_full_path()}'.encode()
+    ).hexdigest()
+    return RESPONSE_KEY.format(
+        user_id=request.user.pk,
+        version=get_data_version(request.user.pk),
+        digest=digest,
+    )
+
+
+def cached_response(request, compute):
+    """Return a Response for `request`, calling `compute()` on a miss.
+
+    `compute` returns a Response whose data is cached under the user's
+    current data version. Without ``API_RESPONSE_CACHE`` it is always
+    called.
+    """
+    if not settings.API_RESPONSE_CACHE:
+        return compute()
+    key = response_cache_key(request)
+    data = cache.get(key)
+    _count_lookup(data is not None)
+    if data is not None:
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = compute()
+    if response.status_code == 200:
+        cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+class CachedListMixin:
+    """Serve `list` from the per-user versioned response cache."""
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: super(CachedListMixin, self).list(
+                request, *args, **kwargs)
+        )
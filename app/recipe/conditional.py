@@ -0,0 +1,99 @@
+"""
+ETag and Last-Modified support for recipe APIs.
+
+These functions are meant for ``django.views.decorators.http.condition``
+and are evaluated before the view runs, so a matching If-None-Match is
+answered with 304 without loading or serializing the recipes.
+
+Validators are read from the database, never from the cache, so every
+process agrees on them. Changes to tags and ingredients move the
+`updated_at` of their recipes (see recipe.signals).
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.db.models import Count, Max
+
+from core.models import Recipe
+
+
+def _digest(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def recipe_updated_at(request, pk=None, lock=False):
+    """Return the `updated_at` watermark of the requested recipe.
+
+    With `lock` the row is locked until the end of the transaction.
+    """
+    cached = getattr(request, '_recipe_updated_at', None)
+    if cached and cached[0] == pk:
+        return cached[1]
+    queryset = Recipe.objects.filter(pk=pk, user=request.user)
+    if lock:
+        queryset = queryset.select_for_update()
+    updated_at = queryset.values_list('updated_at', flat=True).first()
+    request._recipe_updated_at = (pk, updated_at)
+    return updated_at
+
+
+def recipe_version(request, pk=None):
+    """Digest naming the current version of a recipe."""
+    updated_at = recipe_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return _digest(pk, updated_at.isoformat())
+
+
+def recipe_etag(request, pk=None, **kwargs):
+    """ETag of a recipe representation: its version, then a digest of
+    the query string (?fields=, ?expand=) that shaped it."""
+    version = recipe_version(request, pk)
+    if version is None:
+        return None
+    return f'{version}.{_digest(request.get_full_path())}'
+
+
+def locked_recipe_etag(request, pk=None, **kwargs):
+    """Version of the recipe for If-Match, locking the recipe so that
+    the check still holds when the recipe is written."""
+    recipe_updated_at(request, pk, lock=True)
+    return recipe_version(request, pk)
+
+
+def if_match_version(view):
+    """Check If-Match against the recipe version only.
+
+    A client may hold the ETag of any representation of the version: one
+    read with ?fields=, or weakened by the compression middleware. Both
+    name the same version, so the weak prefix and representation digest
+    are dropped before `condition` compares them with
+    `locked_recipe_etag`.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if if_match:
+            request.META['HTTP_IF_MATCH'] = ', '.join(
+                re.sub(r'^(?:W/)?"([0-9a-f]+)\.[0-9a-f]+"$', r'"\1"',
+                       etag.strip())
+                for etag in if_match.split(','))
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def recipe_last_modified(request, pk=None, **kwargs):
+    return recipe_updated_at(request, pk)
+
+
+def recipe_list_etag(request, *args, **kwargs):
+    """ETag of the user's recipes from their newest `updated_at` and
+    their count, which also changes on deletes.
+
+    Lists have no Last-Modified, as deletes don't move any timestamp.
+    """
+    watermark = Recipe.objects.filter(user=request.user).aggregate(
+        updated_at=Max('updated_at'), count=Count('*'))
+    return _digest(request.user.pk, watermark['updated_at'],
+                   watermark['count'], request.get_full_path())
@@ -0,0 +1,87 @@
+"""
+Streaming export of recipes
+"""
+import csv
+import json
+import zlib
+from itertools import islice
+
+from core.models import Recipe
+
+EXPORT_FIELDS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link',
+]
+
+
+def iter_recipe_rows(queryset, chunk_size=1000):
+    """Yield recipe dicts with nested tags and ingredients.
+
+    Recipes are read with a server-side cursor and tags/ingredients are
+    fetched with one query each per chunk, so memory is bounded by
+    `chunk_size` whatever the size of `queryset`.
+    """
+    rows = queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        tags = related_by_recipe(Recipe.tags.through, 'tag', ids)
+        ingredients = related_by_recipe(
+            Recipe.ingredients.through, 'ingredient', ids)
+        for row in chunk:
+            row['price'] = str(row['price'])
+            row['tags'] = tags.get(row['id'], [])
+            row['ingredients'] = ingredients.get(row['id'], [])
+            yield row
+
+
+def related_by_recipe(through, name, recipe_ids):
+    """Map recipe id to a list of related {id, name} dicts in id order."""
+    related = {}
+    links = through.objects.filter(recipe_id__in=recipe_ids).values_list(
+        'recipe_id', f'{name}_id', f'{name}__name').order_by(f'{name}_id')
+    for recipe_id, obj_id, obj_name in links:
+        related.setdefault(recipe_id, []).append(
+            {'id': obj_id, 'name': obj_name})
+    return related
+
+
+def ndjson_stream(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+class _Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS + ['tags', 'ingredients'])
+    for row in rows:
+        yield writer.writerow(
+            [row[field] for field in EXPORT_FIELDS] + [
+                ';'.join(tag['name'] for tag in row['tags']),
+                ';'.join(ing['name'] for ing in row['ingredients']),
+            ]
+        )
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip compress an iterable of str chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+    'csv': (csv_stream, 'text/csv'),
+}
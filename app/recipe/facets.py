@@ -0,0 +1,34 @@
+"""
+Per-tag and per-ingredient recipe counts for the filter UI
+"""
+from django.db.models import Count
+
+from core.models import Recipe
+
+FACET_FIELDS = ['tags', 'ingredients']
+
+
+def facet_counts(queryset):
+    """Count the recipes in `queryset` per tag and per ingredient.
+
+    Runs one grouped query per dimension over the through table, with
+    the filtered recipes as a subquery.
+    """
+    recipe_ids = queryset.order_by().values('pk')
+    facets = {}
+    for field in FACET_FIELDS:
+        m2m = Recipe._meta.get_field(field)
+        target = m2m.m2m_reverse_field_name()
+        name = f'{target}__name'
+        rows = (
+            m2m.remote_field.through.objects
+            .filter(**{f'{m2m.m2m_field_name()}__in': recipe_ids})
+            .values(target, name)
+            .annotate(count=Count('*'))
+            .order_by('-count', name)
+        )
+        facets[field] = [
+            {'id': row[target], 'name': row[name], 'count': row['count']}
+            for row in rows
+        ]
+    return facets
@@ -0,0 +1,56 @@
+"""
+Fast rendering of recipe list pages.
+
+Most of the time spent on a large list goes to RecipeSerializer's
+per-field to_representation calls and to building model instances.
+This builds the same output from ``.values()`` rows and one grouped
+query per nested relation, using plain dicts. It is used by the list
+action when settings.RECIPE_FAST_LIST is set.
+"""
+from core.models import Recipe
+from recipe.export import related_by_recipe
+from recipe.serializers import RecipeSerializer, field_columns
+
+NESTED_FIELDS = {
+    'tags': (Recipe.tags.through, 'tag'),
+    'ingredients': (Recipe.ingredients.through, 'ingredient'),
+}
+
+
+def values_queryset(queryset, fields=None):
+    """Turn the list queryset into one yielding plain recipe rows with
+    the columns needed for `fields`, all fields by default."""
+    if fields is None:
+        fields = RecipeSerializer.Meta.fields
+    # Nested rows are matched on id and the cursor reads the ordering
+    # fields from each row.
+    columns = ['id'] + [
+        column for column in field_columns(fields) if column != 'id']
+    if 'rank' in queryset.query.annotations:
+        columns.append('rank')
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def serialize_recipes(rows, fields=None):
+    """Return what RecipeSerializer(many=True) gives for `rows`."""
+    if fields is None:
+        fields = RecipeSerializer.Meta.fields
+    price = RecipeSerializer().fields['price']
+    ids = [row['id'] for row in rows]
+    nested = {
+        field: related_by_recipe(through, name, ids)
+        for field, (through, name) in NESTED_FIELDS.items()
+        if field in fields
+    }
+    data = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field in nested:
+                item[field] = nested[field].get(row['id'], [])
+            else:
+                item[field] = row[field]
+        if 'price' in item:
+            item['price'] = price.to_representation(row['price'])
+        data.append(item)
+    return data
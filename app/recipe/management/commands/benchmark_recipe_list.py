@@ -0,0 +1,95 @@
+"""
+Django command to compare RecipeSerializer with the fast list path.
+
+Seeds recipes in a transaction that is rolled back at the end, then
+times fetching and serializing pages of each size both ways.
+"""
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.fastlist import serialize_recipes, values_queryset
+from recipe.serializers import RecipeSerializer
+
+
+def _timed(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, result
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the fast recipe list serializer against DRF.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument(
+            '--related', type=int, default=3,
+            help='Tags and ingredients per recipe.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            queryset = self._seed(max(options['sizes']), options['related'])
+            for size in options['sizes']:
+                self._compare(queryset, size, options['runs'])
+            transaction.set_rollback(True)
+
+    def _seed(self, count, related):
+        self.stdout.write(f'Seeding {count} recipes...')
+        user = get_user_model().objects.create_user(
+            'bench-list@example.com', 'bench')
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {n}', time_minutes=n % 90,
+                   price=n % 500 / 100, link=f'https://example.com/{n}')
+            for n in range(count)
+        )
+        for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            objs = model.objects.bulk_create(
+                model(user=user, name=f'{model.__name__} {n}')
+                for n in range(related * 10)
+            )
+            through = getattr(Recipe, field).through
+            column = Recipe._meta.get_field(field).m2m_reverse_name()
+            through.objects.bulk_create(
+                (
+                    through(recipe_id=recipe.id, **{
+                        column: objs[(i + j) % len(objs)].id})
+                    for i, recipe in enumerate(recipes)
+                    for j in range(related)
+                ),
+                batch_size=5000,
+            )
+        return Recipe.objects.defer('search_vector').filter(
+            user=user).order_by('-id')
+
+    def _compare(self, queryset, size, runs):
+        prefetched = queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients', queryset=Ingredient.objects.order_by('id')),
+        )
+        drf_ms, drf_data = _timed(
+            lambda: RecipeSerializer(prefetched[:size], many=True).data, runs)
+        fast_ms, fast_data = _timed(
+            lambda: serialize_recipes(
+                list(values_queryset(queryset)[:size])), runs)
+        if drf_data != fast_data:
+            raise CommandError(f'Outputs differ for {size} recipes.')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{size} recipes'))
+        self.stdout.write(f'  DRF serializer: {drf_ms:9.1f} ms')
+        self.stdout.write(
+            f'  fast path:      {fast_ms:9.1f} ms  '
+            f'({drf_ms / fast_ms:.1f}x faster)'
+        )
@@ -0,0 +1,110 @@
+"""
+Pagination for recipe APIs
+"""
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+def keyset_filter(ordering, values):
+    """Q for the rows after `values` in `ordering`, compared as a tuple."""
+    condition, equal = Q(), {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first.
+
+    Full-text search results are ordered by (rank, id). DRF's cursor
+    only filters on the first ordering field and skips ties with an
+    OFFSET capped at ``offset_cutoff``, and ranks often tie, so for
+    searches the cursor holds both values and pages are filtered on the
+    pair instead.
+    """
+    ordering = ('-id',)
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """Order full-text search results by rank."""
+        if request.query_params.get('q'):
+            return ('-rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if len(self.get_ordering(request, queryset, view)) == 1:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            # Positions are unique, so offsets are never needed.
+            self.cursor = self.cursor._replace(offset=0)
+            reverse, position = self.cursor.reverse, self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse \
+            else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            values = position.split(',')
+            if len(values) != len(ordering):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                queryset = queryset.filter(keyset_filter(ordering, values))
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = \
+                position is not None, position
+            self.has_previous, self.previous_position = \
+                following is not None, following
+        else:
+            self.has_next, self.next_position = \
+                following is not None, following
+            self.has_previous, self.previous_position = \
+                position is not None, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        return ','.join(
+            super(RecipeCursorPagination, self)._get_position_from_instance(
+                instance, (field,))
+            for field in ordering)
+
+
+class NameCursorPagination(CursorPagination):
+    """Keyset pagination over tags and ingredients by name.
+
+    Names are unique per user, so the name alone is a stable cursor and
+    pages are read straight off the (user, name) unique index.
+    """
+    ordering = ('-name',)
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,36 @@
+"""
+Parsers for recipe APIs
+"""
+import json
+
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline delimited JSON lazily, one line at a time.
+
+    Returns a generator of ``(line_number, data, error)`` tuples so the
+    body is never held in memory as a whole. Lines that are not valid
+    JSON objects come back with `data` set to None and an error message.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        return self._iter_lines(stream, encoding)
+
+    def _iter_lines(self, stream, encoding):
+        for line_number, raw in enumerate(stream, start=1):
+            line = raw.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                yield line_number, None, f'JSON parse error - {exc}'
+                continue
+            if not isinstance(data, dict):
+                yield line_number, None, 'Expected a JSON object.'
+                continue
+            yield line_number, data, None
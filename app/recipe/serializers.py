@@ -2,6 +2,10 @@
 Serializers for recipe APIs
 """
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from core.images import rendition_urls
+from core.timing import TimedSerializerMixin
 
 from core.models import (
     Recipe,
@@ -10,28 +14,134 @@ from core.models import (
 )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+def bulk_get_or_create(model, user, names):
+    """Return `user`'s `model` objects for `names`, creating missing ones.
+
+    Runs a fixed number of queries however many names are given. Names
+    are unique per user, so a concurrent request creating the same name
+    makes our insert skip it and the re-select picks up its row.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    existing = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = [name for name in names if name not in existing]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        existing.update(
+            (obj.name, obj)
+            for obj in model.objects.filter(user=user, name__in=missing)
+        )
+    return [existing[name] for name in names]
+
+
+EXPANDABLE_FIELDS = ['tags', 'ingredients']
+
+# Model columns read by serializer fields not named after a column.
+FIELD_COLUMNS = {
+    'renditions': ['image', 'image_status'],
+}
+
+
+def _parse_field_names(value, allowed, param):
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise serializers.ValidationError(
+            {param: [f"Unknown fields: {', '.join(sorted(unknown))}."]})
+    return names
+
+
+def requested_fields(query_params, field_names):
+    """Return the `field_names` selected by ?fields= and ?expand=.
+
+    ?fields= lists the fields to return, all of them by default.
+    ?expand= lists the nested relations to include, overriding
+    ?fields= for them, so ``?expand=`` alone drops all nested data.
+    """
+    selected = set(field_names)
+    if 'fields' in query_params:
+        selected = _parse_field_names(
+            query_params['fields'], field_names, 'fields')
+    if 'expand' in query_params:
+        expandable = [f for f in EXPANDABLE_FIELDS if f in field_names]
+        selected -= set(expandable)
+        selected |= _parse_field_names(
+            query_params['expand'], expandable, 'expand')
+    return [name for name in field_names if name in selected]
+
+
+def field_columns(field_names):
+    """Return the model columns needed to render `field_names`."""
+    columns = []
+    for name in field_names:
+        if name not in EXPANDABLE_FIELDS:
+            columns += FIELD_COLUMNS.get(name, [name])
+    return columns
+
+
+class SparseFieldsMixin:
+    """Drop fields not selected by ?fields= and ?expand= on reads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        selected = requested_fields(request.query_params, list(self.fields))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+
+class IngredientSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
         model = Tag
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
+
+
+class RecipeIngredientSerializer(IngredientSerializer):
+    """Ingredient nested in a recipe.
+
+    Leaves out the recipe count, which changes with other recipes and
+    would make the recipe's ETag stale.
+    """
+
+    class Meta(IngredientSerializer.Meta):
         fields = ['id', 'name']
-        read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeTagSerializer(TagSerializer):
+    """Tag nested in a recipe, without the recipe count."""
+
+    class Meta(TagSerializer.Meta):
+        fields = ['id', 'name']
+
+
+class RecipeSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                       serializers.ModelSerializer):
     """Serializer for recipes."""
-    tags = TagSerializer(many=True, required=False)
-    ingredients = IngredientSerializer(many=True, required=False)
+    tags = RecipeTagSerializer(many=True, required=False)
+    ingredients = RecipeIngredientSerializer(many=True, required=False)
 
     class Meta:
         model = Recipe
@@ -41,46 +151,38 @@ class RecipeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_tags(self, tags):
         """Handle getting or creating tags as needed."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
+        return bulk_get_or_create(
+            Tag, auth_user, [tag['name'] for tag in tags])
+
+    def _get_or_create_ingredients(self, ingredients):
         """Handle getting or creating ingredients as needed."""
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        return bulk_get_or_create(
+            Ingredient, auth_user,
+            [ingredient['name'] for ingredient in ingredients])
 
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
 
         return recipe
 
     def update(self, instance, validated_data):
-        """Update recipe."""
+        """Update recipe, only touching tag/ingredient links that changed."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -89,17 +191,44 @@ class RecipeSerializer(serializers.ModelSerializer):
         return instance
 
 
-class RecipeDetailsSerializer(RecipeSerializer):
+class RenditionsMixin(serializers.Serializer):
+    """Expose URLs of the resized renditions of the recipe image."""
+    renditions = serializers.SerializerMethodField()
+
+    def get_renditions(self, obj):
+        if not obj.image or obj.image_status in (
+                'pending', 'processing', 'failed'):
+            return None
+        request = self.context.get('request')
+        urls = rendition_urls(obj.image.name)
+        if request is not None:
+            urls = {
+                size: {
+                    fmt: request.build_absolute_uri(url)
+                    for fmt, url in formats.items()
+                }
+                for size, formats in urls.items()
+            }
+        return urls
+
+
+class RecipeDetailsSerializer(RenditionsMixin, RecipeSerializer):
     """Serializer for recipe detail view."""
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_status', 'renditions',
+        ]
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + [
+            'image_status',
+        ]
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin, RenditionsMixin,
+                            serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = ['id', 'image', 'image_status', 'renditions']
+        read_only_fields = ['id', 'image_status']
         extra_kwargs = {'image': {'required': True}}
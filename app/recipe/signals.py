@@ -0,0 +1,124 @@
+"""
+Signal handlers for recipe APIs
+"""
+from django.db.models.signals import (
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.counters import (
+    COUNTED_FIELDS,
+    adjust_recipe_counts,
+    recipe_links,
+)
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.cache import bump_data_version
+
+
+def touch_recipes(queryset):
+    """Move the `updated_at` watermark of recipes in `queryset`."""
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_user_cache(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_cache_on_link(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tagged_recipes(sender, instance, created=False, **kwargs):
+    """Renaming or deleting a tag changes the recipes that use it."""
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_with_ingredient(sender, instance, created=False, **kwargs):
+    """Renaming or deleting an ingredient changes the recipes using it."""
+    if not created:
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_linked_recipes(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Adding or removing links changes the recipes involved."""
+    if pk_set is not None and not pk_set:
+        return
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        related_name = 'tags' if sender is Recipe.tags.through \
+            else 'ingredients'
+        touch_recipes(Recipe.objects.filter(**{related_name: instance}))
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_recipe_counts(sender, instance, action, reverse, model, pk_set,
+                         **kwargs):
+    """Keep Tag/Ingredient.recipe_count in step with recipe links.
+
+    Runs inside the related manager's transaction. Removals are counted
+    before the links are deleted, so IDs that were never linked do not
+    skew the counts. The counted links are locked, so a concurrent
+    removal of the same links waits and then counts only what is left.
+    """
+    counted = type(instance) if reverse else model
+    through, column = recipe_links(counted)
+    if action == 'post_add' and pk_set:
+        if reverse:
+            adjust_recipe_counts(counted, {instance.pk: len(pk_set)})
+        else:
+            adjust_recipe_counts(counted, dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear') and pk_set != set():
+        if reverse:
+            links = through.objects.filter(**{column: instance.pk})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            # No COUNT(*): Postgres cannot lock rows of an aggregate.
+            removed = links.select_for_update().values_list('pk', flat=True)
+            adjust_recipe_counts(counted, {instance.pk: -len(removed)})
+        else:
+            links = through.objects.filter(recipe_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(**{f'{column}__in': pk_set})
+            adjust_recipe_counts(counted, dict.fromkeys(
+                links.select_for_update().values_list(column, flat=True),
+                -1))
+
+
+@receiver(pre_delete, sender=Recipe)
+def release_recipe_counts(sender, instance, **kwargs):
+    """Deleting a recipe drops its links without m2m_changed."""
+    for counted in COUNTED_FIELDS:
+        through, column = recipe_links(counted)
+        adjust_recipe_counts(counted, dict.fromkeys(
+            through.objects.filter(recipe_id=instance.pk)
+            .select_for_update().values_list(column, flat=True), -1))
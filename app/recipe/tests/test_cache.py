@@ -0,0 +1,145 @@
+"""
+Tests for the per-user list response cache
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.cache import cache_stats, get_data_version
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+CACHE_STATS_URL = reverse('recipe:cache-stats')
+
+
+def create_user(email='user@example.com', password='user@1234'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('2.50'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(API_RESPONSE_CACHE=True)
+class ListCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        # Only the ETag watermark.
+        with self.assertNumQueries(1):
+            cached = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+
+    def test_cache_keyed_by_query_params(self):
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_cache_keyed_by_host(self):
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL, {'page_size': 1})
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1},
+                              HTTP_HOST='api.example.com')
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertTrue(
+            res.data['next'].startswith('http://api.example.com/'))
+
+    @override_settings(API_RESPONSE_CACHE=False)
+    def test_disabled(self):
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('X-Cache', res)
+
+    def test_save_invalidates_cache(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        recipe.title = 'New title'
+        recipe.save()
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+
+    def test_m2m_change_invalidates_cache(self):
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPE_URL)
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+    def test_delete_invalidates_tag_cache(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        tag.delete()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_other_users_changes_keep_cache(self):
+        other = create_user(email='other@example.com')
+        version = get_data_version(self.user.id)
+
+        create_recipe(user=other)
+
+        self.assertEqual(get_data_version(self.user.id), version)
+
+    def test_cache_stats(self):
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'admin@1234')
+        before = cache_stats()
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['hits'], before['hits'] + 1)
+        self.assertEqual(res.data['misses'], before['misses'] + 1)
+        self.assertGreater(res.data['hit_rate'], 0)
+
+    def test_cache_stats_requires_admin(self):
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
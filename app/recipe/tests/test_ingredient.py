@@ -46,7 +46,7 @@ class PrivateAPITest(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingrediant_for_limited_user(self):
         user2 = create_user(email="user2@example.com")
@@ -55,9 +55,9 @@ class PrivateAPITest(TestCase):
             user=self.user, name="mirchi")
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['id'], new_ingrediant.id)
-        self.assertEqual(res.data[0]['name'], new_ingrediant.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], new_ingrediant.id)
+        self.assertEqual(res.data['results'][0]['name'], new_ingrediant.name)
 
     def test_update_ingrediant(self):
         ingrediant = Ingredient.objects.create(
@@ -91,10 +91,11 @@ class PrivateAPITest(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
+        in1.refresh_from_db()
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -117,4 +118,4 @@ class PrivateAPITest(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
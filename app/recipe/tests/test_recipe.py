@@ -1,16 +1,30 @@
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+import csv
+import gzip
+import io
+import json
 import tempfile
+import threading
+from unittest import mock
 from PIL import Image
 import os
 
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from core.images import delete_renditions, rendition_name
 from core.models import (
+    ImageJob,
     Recipe,
     Tag,
     Ingredient
@@ -22,6 +36,9 @@ from recipe.serializers import (
 )
 
 RECIPE_URL = reverse('recipe:recipe-list')
+FACETS_URL = reverse('recipe:recipe-facets')
+BULK_IMPORT_URL = reverse('recipe:recipe-bulk-import')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -73,7 +90,7 @@ class PrivateRecipesTestCase(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializers = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializers.data)
+        self.assertEqual(res.data['results'], serializers.data)
 
     def test_recipe_for_limited_user(self):
         other_user = create_user(
@@ -85,7 +102,7 @@ class PrivateRecipesTestCase(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializers = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializers.data)
+        self.assertEqual(res.data['results'], serializers.data)
 
     def test_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -322,6 +339,44 @@ class PrivateRecipesTestCase(TestCase):
 
         self.assertTrue(exist)
 
+    def test_create_recipe_nested_query_count_is_constant(self):
+        """Test nested tags/ingredients are resolved in fixed queries."""
+        Ingredient.objects.create(user=self.user, name='Ing 0')
+
+        def payload(n):
+            return {
+                'title': 'Big recipe',
+                'time_minutes': 30,
+                'price': Decimal('12.0'),
+                'tags': [{'name': f'Tag {i}'} for i in range(n)],
+                'ingredients': [{'name': f'Ing {i}'} for i in range(n)],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(RECIPE_URL, payload(3), format='json')
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(RECIPE_URL, payload(30), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small), len(large))
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 30)
+
+    def test_create_recipe_duplicate_tag_names(self):
+        payload = {
+            'title': 'Thai food',
+            'time_minutes': 34,
+            'price': Decimal('7.8'),
+            'tags': [{'name': 'Thai'}, {'name': 'Thai'}]
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_ingredients_on_update(self):
         recipe = create_recipe(user=self.user)
         url = detail_url(recipe.id)
@@ -353,6 +408,25 @@ class PrivateRecipesTestCase(TestCase):
         self.assertIn(second_ingredient, recipe.ingredients.all())
         self.assertNotIn(first_ingredient, recipe.ingredients.all())
 
+    def test_update_recipe_ingredients_keeps_unchanged_links(self):
+        """Test updating ingredients only rewrites links that changed."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        sugar = Ingredient.objects.create(user=self.user, name='Sugar')
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(salt, sugar)
+        through = Recipe.ingredients.through
+        kept = through.objects.get(recipe=recipe, ingredient=salt)
+
+        payload = {'ingredients': [{'name': 'Salt'}, {'name': 'Pepper'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=kept.id).exists())
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Pepper', 'Salt'],
+        )
+
     def test_clear_recipe_ingredients(self):
         """Test clearing a recipes ingredients."""
         ingredient = Ingredient.objects.create(user=self.user, name='Garlic')
@@ -383,9 +457,9 @@ class PrivateRecipesTestCase(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         r1 = create_recipe(user=self.user, title='Chicken curry')
@@ -404,9 +478,637 @@ class PrivateRecipesTestCase(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_match_all(self):
+        t1 = Tag.objects.create(user=self.user, name='Vegan')
+        t2 = Tag.objects.create(user=self.user, name='Quick')
+        both = create_recipe(user=self.user, title='Salad')
+        both.tags.add(t1, t2)
+        one = create_recipe(user=self.user, title='Stew')
+        one.tags.add(t1)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': f'{t1.id},{t2.id}', 'match': 'all'})
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [both.id])
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': f'{t1.id},{t2.id}', 'match': 'any'})
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [one.id, both.id])
+
+    def test_filter_match_all_tags_and_ingredients(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        i1 = Ingredient.objects.create(user=self.user, name='Rice')
+        i2 = Ingredient.objects.create(user=self.user, name='Beans')
+        match = create_recipe(user=self.user, title='Burrito')
+        match.tags.add(tag)
+        match.ingredients.add(i1, i2)
+        missing_tag = create_recipe(user=self.user, title='Chili')
+        missing_tag.ingredients.add(i1, i2)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': str(tag.id),
+            'ingredients': f'{i1.id},{i2.id},{i2.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [match.id])
+
+    def test_filter_no_duplicates_without_distinct(self):
+        t1 = Tag.objects.create(user=self.user, name='Vegan')
+        t2 = Tag.objects.create(user=self.user, name='Quick')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(t1, t2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'tags': f'{t1.id},{t2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+        sql = ctx.captured_queries[1]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_filter_invalid_params(self):
+        for params in ({'tags': '1,x'}, {'ingredients': '1,,2'},
+                       {'tags': '1', 'match': 'some'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """Test full-text search is ranked and limited to the user."""
+        in_description = create_recipe(
+            user=self.user, title='Rice bowl',
+            description='Served with a mild curry sauce')
+        in_title = create_recipe(
+            user=self.user, title='Chicken curry', description='Spicy')
+        create_recipe(user=self.user, title='Pancakes', description='Sweet')
+        other_user = create_user(
+            email='other@example.com', password='other@123')
+        create_recipe(user=other_user, title='Curry')
+
+        res = self.client.get(RECIPE_URL, {'q': 'curries'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [in_title.id, in_description.id],
+        )
+
+    def test_search_recipes_paginated(self):
+        for i in range(5):
+            create_recipe(user=self.user, title=f'Curry {i}')
+
+        seen = []
+        url = RECIPE_URL + '?q=curry&page_size=2'
+        while url:
+            res = self.client.get(url)
+            seen += [r['id'] for r in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_search_follows_title_updates(self):
+        recipe = create_recipe(user=self.user, title='Pancakes')
+        Recipe.objects.filter(id=recipe.id).update(title='Curry')
+
+        res = self.client.get(RECIPE_URL, {'q': 'curry'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_search_pages_through_tied_ranks_by_keyset(self):
+        """Test equal ranks are paged on (rank, id), not with OFFSET."""
+        ids = sorted((create_recipe(user=self.user, title='Curry').id
+                      for _ in range(5)), reverse=True)
+
+        res = self.client.get(RECIPE_URL, {'q': 'curry', 'page_size': 2})
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual([r['id'] for r in res.data['results']], ids[2:4])
+        self.assertFalse(any('OFFSET' in query['sql']
+                             for query in ctx.captured_queries))
+        res = self.client.get(res.data['previous'])
+        self.assertEqual([r['id'] for r in res.data['results']], ids[:2])
+
+    def test_recipe_list_query_count_is_constant(self):
+        """Test listing recipes does not run queries per recipe."""
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}'))
+
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_recipe_list_paginated_with_cursor(self):
+        """Test recipes are paged with opaque next/previous cursors."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        ids = [r.id for r in reversed(recipes)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['results']], ids[:2])
+        self.assertIsNone(res.data['previous'])
+        self.assertIn('cursor=', res.data['next'])
+
+        seen = []
+        url = RECIPE_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            seen += [r['id'] for r in res.data['results']]
+            url = res.data['next']
+        self.assertEqual(seen, ids)
+
+    def test_recipe_detail_query_count(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Tag'))
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ConditionalRequestTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='test@123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.url = detail_url(self.recipe.id)
+
+    def test_detail_not_modified(self):
+        res = self.client.get(self.url)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_on_update(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.recipe.title = 'Changed'
+        self.recipe.save()
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_etag_changes_on_tag_rename(self):
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        self.recipe.tags.add(tag)
+        etag = self.client.get(self.url)['ETag']
+
+        tag.name = 'Brunch'
+        tag.save()
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', res)
+
+    def test_list_etag_changes_on_delete(self):
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        self.recipe.delete()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_ignores_cache(self):
+        """Test list ETags come from the database, not the local cache,
+        so processes that did not see a write agree on them."""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        cache.clear()
+
+        self.assertEqual(self.client.get(RECIPE_URL)['ETag'], etag)
+
+    def test_if_match_update(self):
+        etag = self.client.get(self.url)['ETag']
+        payload = {'title': 'First'}
+
+        res = self.client.patch(self.url, payload, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+        res = self.client.patch(
+            self.url, {'title': 'Second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'First')
+
+    def test_if_match_with_sparse_fields_etag(self):
+        """Test the ETag of a ?fields= read works in If-Match."""
+        etag = self.client.get(self.url, {'fields': 'id,title'})['ETag']
+        self.assertNotEqual(etag, self.client.get(self.url)['ETag'])
+
+        res = self.client.patch(
+            self.url, {'title': 'First'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(
+            self.url, {'title': 'Second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_if_match_with_compressed_etag(self):
+        """Test the weak ETag of a compressed response works in If-Match."""
+        self.recipe.description = 'Stir well. ' * 200
+        self.recipe.save()
+        res = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        etag = res['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        res = self.client.patch(
+            self.url, {'title': 'First'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.patch(
+            self.url, {'title': 'Second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+
+class ConcurrentUpdateTestCase(TransactionTestCase):
+
+    def test_if_match_serializes_writers(self):
+        """Test two writers with the same ETag: one wins, one gets 412."""
+        user = create_user(email='test@example.com', password='test@123')
+        url = detail_url(create_recipe(user=user).id)
+        client = APIClient()
+        client.force_authenticate(user)
+        etag = client.get(url)['ETag']
+        writing, release = threading.Event(), threading.Event()
+        update = RecipeDetailsSerializer.update
+        statuses = {}
+
+        def slow_update(serializer, instance, validated_data):
+            if validated_data['title'] == 'First':
+                writing.set()
+                release.wait(5)
+            return update(serializer, instance, validated_data)
+
+        def patch(title):
+            try:
+                writer = APIClient()
+                writer.force_authenticate(user)
+                statuses[title] = writer.patch(
+                    url, {'title': title}, HTTP_IF_MATCH=etag).status_code
+            finally:
+                connection.close()
+
+        with mock.patch.object(RecipeDetailsSerializer, 'update',
+                               slow_update):
+            first = threading.Thread(target=patch, args=('First',))
+            first.start()
+            writing.wait(5)
+            second = threading.Thread(target=patch, args=('Second',))
+            second.start()
+            # The second writer waits for the first one's row lock.
+            second.join(0.5)
+            self.assertTrue(second.is_alive())
+            release.set()
+            first.join()
+            second.join()
+
+        self.assertEqual(statuses, {'First': 200, 'Second': 412})
+        self.assertEqual(client.get(url).data['title'], 'First')
+
+
+class SparseFieldsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='test@123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_list_fields(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': self.recipe.title}],
+        )
+        self.assertEqual(len(ctx), 2)
+        self.assertNotIn('"time_minutes"', ctx.captured_queries[1]['sql'])
+
+    def test_list_loads_only_serialized_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPE_URL)
+
+        self.assertNotIn('"description"', ctx.captured_queries[1]['sql'])
+
+    def test_list_expand(self):
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL, {'expand': ''})
+        self.assertNotIn('tags', res.data['results'][0])
+        self.assertIn('price', res.data['results'][0])
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPE_URL, {'fields': 'id', 'expand': 'tags'})
+        self.assertEqual(res.data['results'][0], {
+            'id': self.recipe.id,
+            'tags': [{'id': self.recipe.tags.get().id, 'name': 'Vegan'}],
+        })
+
+    def test_detail_fields(self):
+        res = self.client.get(
+            detail_url(self.recipe.id), {'fields': 'description,renditions'})
+
+        self.assertEqual(res.data, {
+            'description': self.recipe.description,
+            'renditions': None,
+        })
+
+    def test_unknown_fields(self):
+        for params in ({'fields': 'id,secret'}, {'expand': 'title'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ignored_on_write(self):
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '2.00'}
+
+        res = self.client.post(
+            f'{RECIPE_URL}?fields=id', payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Soup')
+
+
+class FastListTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='test@123')
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Dinner')
+        ]
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(5):
+            recipe = create_recipe(
+                user=self.user, title=f'Curry {i}', price=Decimal(f'{i}.5'),
+                link=f'https://example.com/{i}' if i % 2 else '')
+            recipe.tags.add(*tags[i % 3:])
+            if i % 2:
+                recipe.ingredients.add(salt)
+        self.tag = tags[1]
+
+    def _get_both(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        cache.clear()
+        with self.settings(RECIPE_FAST_LIST=True):
+            with self.assertNumQueries(len(ctx)):
+                fast = self.client.get(url, params)
+        cache.clear()
+        return res, fast
+
+    def test_matches_serializer_output(self):
+        for params in ({}, {'page_size': 2}, {'tags': self.tag.id},
+                       {'q': 'curry', 'page_size': 2},
+                       {'fields': 'title,price', 'expand': 'tags'},
+                       {'expand': ''}):
+            res, fast = self._get_both(RECIPE_URL, params)
+
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, res.content)
+
+    def test_follows_cursor(self):
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        res, fast = self._get_both(res.data['next'])
+
+        self.assertEqual(fast.content, res.content)
+        self.assertEqual(len(fast.data['results']), 2)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+
+        call_command('benchmark_recipe_list', sizes=[3, 6], runs=1,
+                     stdout=out)
+
+        self.assertIn('6 recipes', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 5)
+
+
+class FacetsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='test@123')
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user)
+        r1.tags.add(self.vegan, self.quick)
+        r1.ingredients.add(self.rice)
+        r2 = create_recipe(user=self.user)
+        r2.tags.add(self.vegan)
+        other = create_recipe(user=create_user(email='other@example.com'))
+        other.tags.add(Tag.objects.create(user=other.user, name='Vegan'))
+
+    def test_facet_counts(self):
+        with self.assertNumQueries(3):
+            res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'tags': [
+                {'id': self.vegan.id, 'name': 'Vegan', 'count': 2},
+                {'id': self.quick.id, 'name': 'Quick', 'count': 1},
+            ],
+            'ingredients': [
+                {'id': self.rice.id, 'name': 'Rice', 'count': 1},
+            ],
+        })
+
+    def test_facet_counts_filtered(self):
+        res = self.client.get(FACETS_URL, {'tags': self.quick.id})
+
+        self.assertEqual(
+            [(f['name'], f['count']) for f in res.data['tags']],
+            [('Quick', 1), ('Vegan', 1)],
+        )
+        self.assertEqual(res.data['ingredients'][0]['count'], 1)
+
+    @override_settings(API_RESPONSE_CACHE=True)
+    def test_facets_cached(self):
+        res = self.client.get(FACETS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(FACETS_URL)
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(FACETS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_recipe(user=self.user).tags.add(self.quick)
+        res = self.client.get(FACETS_URL)
+        self.assertEqual(res.data['tags'][0]['count'], 2)
+
+
+class BulkImportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='test@123')
+        self.client.force_authenticate(self.user)
+
+    def _import(self, rows):
+        body = '\n'.join(
+            row if isinstance(row, str) else json.dumps(row) for row in rows
+        )
+        res = self.client.post(
+            BULK_IMPORT_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_bulk_import_creates_recipes(self):
+        Tag.objects.create(user=self.user, name='Dinner')
+        rows = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '4.50',
+                'tags': [{'name': 'Dinner'}, {'name': f'Tag {i % 2}'}],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(5)
+        ]
+
+        with self.settings(RECIPE_IMPORT_CHUNK_SIZE=2):
+            results = self._import(rows)
+
+        self.assertEqual([r['line'] for r in results], [1, 2, 3, 4, 5])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(
+            sorted(r['id'] for r in results),
+            sorted(recipes.values_list('id', flat=True)),
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        recipe = recipes.get(title='Recipe 1')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Dinner', 'Tag 1'],
+        )
+        self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'recipe_count')),
+            {'Dinner': 5, 'Tag 0': 3, 'Tag 1': 2},
+        )
+        self.assertEqual(Ingredient.objects.get().recipe_count, 5)
+
+    def test_bulk_import_reports_invalid_lines(self):
+        rows = [
+            {'title': 'Good', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'Missing fields'},
+            'not json',
+            '[1, 2]',
+        ]
+
+        results = self._import(rows)
+
+        self.assertEqual(len(results), 4)
+        self.assertIn('id', results[0])
+        self.assertIn('time_minutes', results[1]['errors'])
+        self.assertIn('JSON parse error', results[2]['errors'])
+        self.assertIn('errors', results[3])
+        self.assertEqual(Recipe.objects.count(), 1)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='test@123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(3)
+        ]
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipes[0].tags.add(tag)
+        self.recipes[0].ingredients.add(ingredient)
+        other_user = create_user(
+            email='other@example.com', password='other@123')
+        create_recipe(user=other_user)
+
+    def _content(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b''.join(res.streaming_content)
+
+    def test_export_ndjson(self):
+        with self.settings(RECIPE_EXPORT_CHUNK_SIZE=2):
+            res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [recipe.id for recipe in reversed(self.recipes)],
+        )
+        first = rows[-1]
+        self.assertEqual(first['price'], '5.24')
+        self.assertEqual(first['tags'][0]['name'], 'Dinner')
+        self.assertEqual(first['ingredients'][0]['name'], 'Salt')
+        self.assertEqual(rows[0]['tags'], [])
+
+    def test_export_csv_gzip(self):
+        params = {'output': 'csv', 'compress': 'gzip'}
+        res = self.client.get(EXPORT_URL, params)
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        self.assertIn('recipes.csv.gz', res['Content-Disposition'])
+        content = gzip.decompress(self._content(res)).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1]['tags'], 'Dinner')
+
+    def test_export_unknown_format(self):
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class ImageUploadTestCase(TestCase):
@@ -417,6 +1119,8 @@ class ImageUploadTestCase(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        if self.recipe.image:
+            delete_renditions(self.recipe.image.name)
         return self.recipe.image.delete()
 
     def test_image_upload(self):
@@ -432,3 +1136,18 @@ class ImageUploadTestCase(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(res.data['image_status'], 'pending')
+        self.assertIsNone(res.data['renditions'])
+        self.assertTrue(ImageJob.objects.filter(
+            recipe=self.recipe, status=ImageJob.PENDING).exists())
+
+        call_command('process_image_jobs', once=True, workers=0,
+                     stdout=io.StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'ready')
+        thumb = rendition_name(self.recipe.image.name, 'thumb', 'webp')
+        self.assertTrue(default_storage.exists(thumb))
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data['renditions']['thumb']['webp'].endswith(
+            os.path.basename(thumb)))
@@ -1,23 +1,68 @@
+import json
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+)
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.utils.cache import quote_etag
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import (
     viewsets,
     mixins,
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.views import APIView
 from core.models import (
     Recipe,
     Tag,
     Ingredient
 )
+from core.jobs import enqueue_image_job
+from core.timing import ServerTimingMixin, phase
+from user.authentication import CachedTokenAuthentication
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailsSerializer,
     TagSerializer,
     IngredientSerializer,
-    RecipeImageSerializer
+    RecipeImageSerializer,
+    field_columns,
+    requested_fields,
+)
+from recipe.pagination import (
+    RecipeCursorPagination,
+    NameCursorPagination,
+)
+from recipe.parsers import NDJSONParser
+from recipe.cache import CachedListMixin, cache_stats, cached_response
+from recipe.conditional import (
+    if_match_version,
+    locked_recipe_etag,
+    recipe_etag,
+    recipe_last_modified,
+    recipe_list_etag,
+)
+from recipe.bulk import import_recipes
+from recipe.facets import facet_counts
+from recipe.fastlist import serialize_recipes, values_queryset
+from recipe.export import (
+    EXPORT_FORMATS,
+    iter_recipe_rows,
+    gzip_stream,
 )
 
 from drf_spectacular.utils import (
@@ -28,45 +73,135 @@ from drf_spectacular.utils import (
 )
 
 
-@extend_schema_view(
-    list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Coma separated list of IDs to filter'
-            ),
-            OpenApiParameter(
-                'ingredients',
-                OpenApiTypes.STR,
-                description='Coma separated list of ingredients IDs to filter'
-            )
-        ]
+FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Coma separated list of IDs to filter'
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='Coma separated list of ingredients IDs to filter'
+    ),
+    OpenApiParameter(
+        'match',
+        OpenApiTypes.STR,
+        enum=['any', 'all'],
+        description='Return recipes with any (default) or all of '
+                    'the given tags and ingredients'
+    ),
+    OpenApiParameter(
+        'q',
+        OpenApiTypes.STR,
+        description='Full-text search over title and description'
     )
+]
+
+
+FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return'
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma separated list of nested relations to include, '
+                    'tags and/or ingredients. Empty to include none'
+    ),
+]
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=FILTER_PARAMETERS + FIELDS_PARAMETERS),
+    retrieve=extend_schema(parameters=FIELDS_PARAMETERS),
+    facets=extend_schema(
+        parameters=FILTER_PARAMETERS,
+        responses={200: OpenApiTypes.OBJECT},
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, CachedListMixin,
+                    viewsets.ModelViewSet):
     serializer_class = RecipeDetailsSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    queryset = Recipe.objects.defer('search_vector')
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    # token lookup + ETag watermark + recipes + tags + ingredients
+    query_budget = {'list': 5, 'retrieve': 5, 'facets': 4}
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+    def _params_to_ints(self, qs, param):
+        try:
+            return {int(str_id) for str_id in qs.split(',')}
+        except ValueError:
+            raise ValidationError(
+                {param: ['Expected a comma separated list of IDs.']})
+
+    def _filter_related(self, queryset, field, ids, match):
+        """Keep recipes linked to any or all of `ids` through `field`.
+
+        Uses a correlated EXISTS on the through table, so recipes are
+        never repeated and need no DISTINCT. For `all` the links are
+        counted per recipe in the subquery.
+        """
+        m2m = Recipe._meta.get_field(field)
+        links = m2m.remote_field.through.objects.filter(**{
+            m2m.m2m_column_name(): OuterRef('pk'),
+            f'{m2m.m2m_reverse_name()}__in': ids,
+        })
+        if match == 'all':
+            links = links.values(m2m.m2m_column_name()).annotate(
+                matched=Count('*')).filter(matched=len(ids))
+        return queryset.filter(Exists(links))
 
     def get_queryset(self):
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        search = self.request.query_params.get('q')
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': ['Expected "any" or "all".']})
         queryset = self.queryset
+        if search:
+            query = SearchQuery(search, search_type='websearch',
+                                config='english')
+            # Cast so the rank round-trips exactly through the cursor.
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+            )
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            tag_ids = self._params_to_ints(tags, 'tags')
+            queryset = self._filter_related(queryset, 'tags', tag_ids, match)
         if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            ingredients_ids = self._params_to_ints(
+                ingredients, 'ingredients')
+            queryset = self._filter_related(
+                queryset, 'ingredients', ingredients_ids, match)
 
-        return queryset.filter(
-            user=self.request.user
-            ).order_by('-id').distinct()
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        fields = self._selected_fields()
+        if fields is not None:
+            queryset = queryset.only(*field_columns(fields))
+        return queryset.prefetch_related(*(
+            Prefetch(field, queryset=model.objects.order_by('id'))
+            for field, model in (('tags', Tag), ('ingredients', Ingredient))
+            if fields is None or field in fields
+        ))
+
+    def _selected_fields(self):
+        """Serializer fields picked by ?fields= and ?expand=.
+
+        None for actions that do not render a recipe or need every
+        column.
+        """
+        if self.action not in ('list', 'retrieve'):
+            return None
+        return requested_fields(
+            self.request.query_params,
+            self.get_serializer_class().Meta.fields,
+        )
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -75,6 +210,45 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeImageSerializer
         return self.serializer_class
 
+    @method_decorator(condition(etag_func=recipe_list_etag))
+    def list(self, request, *args, **kwargs):
+        if settings.RECIPE_FAST_LIST:
+            return cached_response(request, self._fast_list)
+        return super().list(request, *args, **kwargs)
+
+    def _fast_list(self):
+        fields = self._selected_fields()
+        queryset = values_queryset(
+            self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(queryset)
+        with phase('serialize'):
+            data = serialize_recipes(page, fields)
+        return self.get_paginated_response(data)
+
+    @method_decorator(condition(
+        etag_func=recipe_etag,
+        last_modified_func=recipe_last_modified,
+    ))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(if_match_version)
+    @method_decorator(transaction.atomic)
+    @method_decorator(condition(etag_func=locked_recipe_etag))
+    def update(self, request, *args, **kwargs):
+        """Update a recipe, honouring If-Match for optimistic locking.
+
+        The recipe is locked before If-Match is checked, so concurrent
+        writers with the same ETag are serialized and all but the first
+        get 412.
+        """
+        response = super().update(request, *args, **kwargs)
+        request._recipe_updated_at = None
+        etag = recipe_etag(request, kwargs.get('pk'))
+        if etag:
+            response['ETag'] = quote_etag(etag)
+        return response
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -83,16 +257,93 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save()
+            enqueue_image_job(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['GET'], detail=False)
+    @method_decorator(condition(etag_func=recipe_list_etag))
+    def facets(self, request):
+        """Count recipes per tag and ingredient under the current filter."""
+        return cached_response(request, self._facets)
+
+    def _facets(self):
+        with phase('queryset'):
+            return Response(facet_counts(self.get_queryset()))
+
+    @extend_schema(
+        request={'application/x-ndjson': RecipeDetailsSerializer},
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.OBJECT},
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk-import',
+            parser_classes=[NDJSONParser])
+    def bulk_import(self, request):
+        """Create recipes from an NDJSON body, streaming back results."""
+        results = import_recipes(
+            request.user,
+            request.data,
+            context=self.get_serializer_context(),
+            chunk_size=settings.RECIPE_IMPORT_CHUNK_SIZE,
+        )
+        return StreamingHttpResponse(
+            (json.dumps(result) + '\n' for result in results),
+            content_type='application/x-ndjson',
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'output',
+                OpenApiTypes.STR,
+                enum=sorted(EXPORT_FORMATS),
+                description='Export format, ndjson (default) or csv'
+            ),
+            OpenApiParameter(
+                'compress',
+                OpenApiTypes.STR,
+                enum=['gzip'],
+                description='Set to gzip to download a gzip file'
+            ),
+        ],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON or CSV."""
+        output = request.query_params.get('output', 'ndjson')
+        compress = request.query_params.get('compress')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Unknown format {output!r}.'})
+        if compress not in (None, 'gzip'):
+            raise ValidationError(
+                {'compress': f'Unknown compression {compress!r}.'})
+
+        rows = iter_recipe_rows(
+            self.get_queryset().prefetch_related(None),
+            chunk_size=settings.RECIPE_EXPORT_CHUNK_SIZE,
+        )
+        stream, content_type = EXPORT_FORMATS[output]
+        content = stream(rows)
+        filename = f'recipes.{output}'
+        if compress:
+            content = gzip_stream(content)
+            content_type = 'application/gzip'
+            filename += '.gz'
 
-class BaseViewSet(mixins.UpdateModelMixin, mixins.ListModelMixin,
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = \
+            f'attachment; filename="{filename}"'
+        return response
+
+
+class BaseViewSet(ServerTimingMixin, CachedListMixin,
+                  mixins.UpdateModelMixin, mixins.ListModelMixin,
                   mixins.DestroyModelMixin,
                   viewsets.GenericViewSet):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameCursorPagination
 
     def get_queryset(self):
         assigned_only = bool(
@@ -100,10 +351,18 @@ class BaseViewSet(mixins.UpdateModelMixin, mixins.ListModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name')
+
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError(
+                {'name': ['You already have one with this name.']})
 
 
 class TagViewSet(BaseViewSet):
@@ -114,3 +373,13 @@ class TagViewSet(BaseViewSet):
 class IngredientViewSet(BaseViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+class CacheStatsView(ServerTimingMixin, APIView):
+    """Hit/miss statistics for cached list responses."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        return Response(cache_stats())
@@ -0,0 +1,163 @@
+"""
+Cached token authentication.
+
+Resolving a token to its user costs a query on every request with DRF's
+TokenAuthentication. CachedTokenAuthentication keeps resolved users in a
+bounded in-process LRU with a TTL and, optionally, in the Django cache
+so other processes can share lookups. Entries are invalidated by the
+signal handlers in user.signals when a token is deleted or its user is
+saved (deactivation, password change, ...).
+
+Without the Django cache, other processes' LRUs only learn about this
+when their entry expires, so keep the TTL short. With it, every token
+has a generation in the Django cache that invalidation replaces, and a
+local hit is only used while its generation is current: one small cache
+read per request instead of unpickling the user.
+"""
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.metrics import count_cache_lookup
+
+DJANGO_CACHE_KEY = 'auth:token:{digest}'
+GENERATION_KEY = 'auth:token:generation:{digest}'
+
+
+class LRUCache:
+    """A thread safe, size bounded mapping whose entries expire."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _settings():
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {})
+
+
+token_cache = LRUCache(
+    max_size=_settings().get('MAX_SIZE', 10000),
+    ttl=_settings().get('TTL', 60),
+)
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _django_cache_key(key):
+    return DJANGO_CACHE_KEY.format(digest=_digest(key))
+
+
+def _generation_key(key):
+    return GENERATION_KEY.format(digest=_digest(key))
+
+
+def _new_generation():
+    return uuid.uuid4().hex
+
+
+def get_cached_user(key):
+    shared = _settings().get('USE_DJANGO_CACHE')
+    user = None
+    entry = token_cache.get(key)
+    if entry is not None:
+        user, generation = entry
+        if shared and cache.get(_generation_key(key)) != generation:
+            # Invalidated by another process.
+            token_cache.delete(key)
+            user = None
+    if user is None and shared:
+        user = cache.get(_django_cache_key(key))
+        if user is not None:
+            _cache_locally(key, user)
+    count_cache_lookup('token_auth', user is not None)
+    return user
+
+
+def _cache_locally(key, user):
+    generation = None
+    if _settings().get('USE_DJANGO_CACHE'):
+        generation_key = _generation_key(key)
+        cache.add(generation_key, _new_generation(), None)
+        generation = cache.get(generation_key)
+        if generation is None:
+            return
+    token_cache.set(key, (user, generation))
+
+
+def cache_user(key, user):
+    _cache_locally(key, user)
+    if _settings().get('USE_DJANGO_CACHE'):
+        cache.set(_django_cache_key(key), user, _settings().get('TTL', 60))
+
+
+def invalidate_token(key):
+    """Forget the user cached for token `key`, in every process when the
+    Django cache is used."""
+    token_cache.delete(key)
+    if _settings().get('USE_DJANGO_CACHE'):
+        cache.set(_generation_key(key), _new_generation(), None)
+        cache.delete(_django_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that caches the token -> user lookup."""
+
+    def authenticate_credentials(self, key):
+        user = get_cached_user(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache_user(key, user)
+            return (copy.copy(user), token)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        # Each request gets its own copy so changes to request.user do
+        # not leak into the cache.
+        user = copy.copy(user)
+        return (user, Token(key=key, user=user))
@@ -0,0 +1,150 @@
+"""
+Tests for cached token authentication
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import (
+    LRUCache,
+    cache_user,
+    get_cached_user,
+    invalidate_token,
+    token_cache,
+)
+
+ME_URL = reverse('user:me')
+
+
+class LRUCacheTests(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_entries_expire(self):
+        lru = LRUCache(max_size=2, ttl=-1)
+        lru.set('a', 1)
+
+        self.assertIsNone(lru.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='test@123', name='Test')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_invalidated(self):
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_not_served_stale(self):
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    @override_settings(TOKEN_AUTH_CACHE={'USE_DJANGO_CACHE': True})
+    def test_django_cache_shared(self):
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(TOKEN_AUTH_CACHE={'USE_DJANGO_CACHE': True})
+class SharedInvalidationTests(TestCase):
+    """Two LRUs stand in for the local caches of two processes, sharing
+    the Django cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='test@123')
+        self.key = Token.objects.create(user=self.user).key
+        self.first = LRUCache(max_size=10, ttl=60)
+        self.second = LRUCache(max_size=10, ttl=60)
+
+    def in_process(self, lru):
+        return patch('user.authentication.token_cache', lru)
+
+    def test_invalidation_reaches_other_processes(self):
+        for lru in (self.first, self.second):
+            with self.in_process(lru):
+                cache_user(self.key, self.user)
+
+        with self.in_process(self.second):
+            invalidate_token(self.key)
+
+        with self.in_process(self.first):
+            self.assertIsNone(get_cached_user(self.key))
+            self.assertEqual(len(self.first), 0)
+
+    def test_local_hit_after_recaching(self):
+        with self.in_process(self.first):
+            cache_user(self.key, self.user)
+        with self.in_process(self.second):
+            invalidate_token(self.key)
+            cache_user(self.key, self.user)
+
+        generation = self.second.get(self.key)[1]
+
+        with self.in_process(self.first):
+            # The stale entry is replaced by the shared, current one.
+            self.assertEqual(get_cached_user(self.key), self.user)
+        self.assertEqual(self.first.get(self.key)[1], generation)